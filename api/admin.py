@@ -2,8 +2,14 @@
 Models for the API admin interface.
 This file registers the Language, Author, and Book models with the Django admin site.
 """
+from django import forms
 from django.contrib import admin
-from .models import Language, Author, Book, Wishlist, BookRental
+
+from . import services
+from .models import (
+    Language, Author, Book, BookInventory, Wishlist, BookRental, RentalDailyStat,
+    WishlistNotification, WishlistSubscription
+)
 
 # Register your models here.
 
@@ -24,12 +30,19 @@ class BookAdmin(admin.ModelAdmin):
     list_filter = ('language', 'publication_year')
     filter_horizontal = ('authors',)
     ordering = ('-publication_year',)
+    # Follows the copy counter; change the copies in the Book Inventory admin.
+    readonly_fields = ('is_available',)
+
+class WishlistSubscriptionInline(admin.TabularInline):
+    model = WishlistSubscription
+    raw_id_fields = ('book',)
+    extra = 0
 
 @admin.register(Wishlist)
 class WishlistAdmin(admin.ModelAdmin):
     list_display = ('wishlist_user_email', 'wishlist_user_name', 'created_at')
     search_fields = ('wishlist_user_email', 'wishlist_user_name')
-    filter_horizontal = ('books',)
+    inlines = (WishlistSubscriptionInline,)
     ordering = ('-created_at',)
 
 @admin.register(BookRental)
@@ -39,7 +52,59 @@ class BookRentalAdmin(admin.ModelAdmin):
     list_filter = ('borrowed_date', 'returned_date',)
     ordering = ('-borrowed_date',)
 
-    def get_readonly_fields(self, request, obj=None):
-        if obj and obj.returned_date:
-            return self.readonly_fields + ('book', 'borrower_email', 'borrowed_date')
-        return self.readonly_fields
+    # Rentals are created and closed through the borrow and return services,
+    # which also keep the copy counters and the daily rollup in step; edits
+    # made here would bypass both, so the admin only displays them.
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(RentalDailyStat)
+class RentalDailyStatAdmin(admin.ModelAdmin):
+    list_display = ('day', 'borrower_email', 'rentals', 'active_rentals', 'returned_days')
+    search_fields = ('borrower_email',)
+    list_filter = ('day',)
+    ordering = ('-day',)
+
+
+@admin.register(WishlistNotification)
+class WishlistNotificationAdmin(admin.ModelAdmin):
+    list_display = ('book', 'created_at', 'processed_at', 'attempts')
+    search_fields = ('book__title',)
+    list_filter = ('processed_at',)
+    ordering = ('-created_at',)
+
+
+class BookInventoryForm(forms.ModelForm):
+    class Meta:
+        model = BookInventory
+        fields = ('total_copies',)
+
+    def clean_total_copies(self):
+        total_copies = self.cleaned_data['total_copies']
+        on_loan = self.instance.total_copies - self.instance.available_copies
+        if total_copies < on_loan:
+            raise forms.ValidationError(f"{on_loan} copies are on loan.")
+        return total_copies
+
+
+@admin.register(BookInventory)
+class BookInventoryAdmin(admin.ModelAdmin):
+    form = BookInventoryForm
+    list_display = ('book', 'total_copies', 'available_copies', 'updated_at')
+    search_fields = ('book__title',)
+    readonly_fields = ('book', 'available_copies')
+
+    def has_add_permission(self, request):
+        # Every book gets its inventory when it is created.
+        return False
+
+    def save_model(self, request, obj, form, change):
+        # Adjust the counters atomically instead of saving the edited row.
+        services.set_copies(obj.book, obj.total_copies)
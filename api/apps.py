@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        # Connect the search index, report cache and book freshness signal handlers.
+        from . import caching, conditional, search  # noqa: F401
+        # Time the queries of measured requests on every database connection.
+        from . import instrumentation
+        connection_created.connect(instrumentation.install)
@@ -0,0 +1,103 @@
+"""
+Async versions of the read endpoints, served under ASGI.
+
+These are plain Django async views rather than DRF viewsets: every query
+goes through the async ORM (``acount``, ``aaggregate``, ``aiterator``), so
+one ASGI worker keeps serving other requests while a query or a slow client
+is waiting. Responses match the synchronous endpoints, except that the
+book list does not answer conditional requests.
+"""
+from contextlib import nullcontext
+
+from django.http import HttpResponse
+from django.views.decorators.http import require_GET
+from rest_framework import status
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+
+from .caching import (
+    aget_cached_report, areplica_may_lag, areport_cache_key, aserialize_books, aset_cached_report,
+    cache_timeout
+)
+from .instrumentation import serializing
+from .models import Book, BookRental
+from .pagination import CustomPagination, KeysetPagination
+from .renderers import ORJSONRenderer
+from .reports import arental_statistics, arollup_statistics, filter_rentals
+from .routers import read_from_primary, replica_reads
+from .search import filter_books
+from .serializers import BookRentalSerializer, BookSerializer
+from .views import BookViewSet
+
+
+def render(data, status_code=status.HTTP_200_OK, headers=None):
+    """Render ``data`` as a JSON response."""
+    return HttpResponse(ORJSONRenderer().render(data), status=status_code,
+                        content_type='application/json', headers=headers)
+
+
+def get_paginator(request, cursor_ordering):
+    """Return the paginator selected by the request's query parameters."""
+    if KeysetPagination.requested(request):
+        return KeysetPagination(ordering=cursor_ordering)
+    return CustomPagination()
+
+
+def paginated_data(paginator, data):
+    """Wrap ``data`` like the paginator's ``get_paginated_response``."""
+    return paginator.get_paginated_response(data).data
+
+
+@require_GET
+@replica_reads
+async def book_list(request):
+    """List and search books (async version of ``GET /api/books/``)"""
+    request = Request(request)
+    books = BookSerializer.values(filter_books(Book.objects.all(), request.query_params))
+    paginator = get_paginator(request, BookViewSet.cursor_ordering)
+    try:
+        page = await paginator.apaginate_queryset(books, request)
+    except NotFound as e:
+        return render({'detail': e.detail}, status.HTTP_404_NOT_FOUND)
+    with serializing():
+        data = await aserialize_books(page)
+    return render(paginated_data(paginator, data))
+
+
+@require_GET
+@replica_reads
+async def rental_report(request):
+    """Rental report with statistics (async version of ``GET /api/books/rental-report/``)"""
+    request = Request(request)
+    live = request.query_params.get('live', '').lower() == 'true'
+    use_cache = cache_timeout() > 0 and not live
+    if use_cache:
+        cache_key = await areport_cache_key(request)
+        cached = await aget_cached_report(cache_key)
+        if cached is not None:
+            return render(cached, headers={'X-Cache': 'HIT'})
+
+    with read_from_primary() if use_cache and await areplica_may_lag() else nullcontext():
+        rentals = filter_rentals(BookRental.objects.all(), request.query_params)
+        if live:
+            stats = await arental_statistics(rentals)
+        else:
+            stats = await arollup_statistics(request.query_params)
+
+        paginator = get_paginator(request, BookViewSet.rental_cursor_ordering)
+        try:
+            page = await paginator.apaginate_queryset(
+                BookRentalSerializer.values(rentals.order_by('-borrowed_date')), request)
+        except NotFound as e:
+            return render({'detail': e.detail}, status.HTTP_404_NOT_FOUND)
+    with serializing():
+        rental_history = BookRentalSerializer.represent(page)
+    data = paginated_data(paginator, {
+        'statistics': stats,
+        'rental_history': rental_history,
+    })
+
+    if use_cache:
+        await aset_cached_report(cache_key, data)
+        return render(data, headers={'X-Cache': 'MISS'})
+    return render(data)
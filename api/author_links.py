@@ -0,0 +1,49 @@
+"""
+Books affected by changes to the book/author links.
+
+The search index and the conditional GET validators both react when a book
+gains or loses authors, or an author is deleted. The receivers here record an
+author's books before a delete or clear removes the links, once for both, and
+``changed_book_ids``/``deleted_author_book_ids`` give the post-change
+receivers the ids of the books to refresh.
+"""
+from django.db.models.signals import m2m_changed, pre_delete
+from django.dispatch import receiver
+
+from .models import Author, Book
+
+
+def remember_author_books(author, using=None):
+    """Record the ids of the books linked to ``author`` before the links go."""
+    author._linked_book_ids = list(author.books.using(using).values_list('id', flat=True))
+
+
+def deleted_author_book_ids(author):
+    """Return the ids of the books a deleted author was linked to."""
+    return getattr(author, '_linked_book_ids', [])
+
+
+def changed_book_ids(instance, action, reverse, pk_set):
+    """
+    Return the ids of the books whose author list a ``Book.authors``
+    ``m2m_changed`` signal has changed, or an empty list for the ``pre_*``
+    actions, before anything changed.
+    """
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return []
+    if not reverse:
+        return [instance.pk]
+    if action == 'post_clear':
+        return getattr(instance, '_linked_book_ids', [])
+    return list(pk_set)
+
+
+@receiver(pre_delete, sender=Author)
+def author_deleting(sender, instance, using, **kwargs):
+    remember_author_books(instance, using)
+
+
+@receiver(m2m_changed, sender=Book.authors.through)
+def author_clearing(sender, instance, action, reverse, using, **kwargs):
+    if reverse and action == 'pre_clear':
+        remember_author_books(instance, using)
@@ -0,0 +1,209 @@
+"""
+Response cache for the rental report and cached book representations.
+
+Report entries are keyed on the normalised query parameters under a version
+number; any write to ``BookRental`` bumps the version, which orphans every
+cached report at once. The version is the time of the last bump, so
+``replica_may_lag`` can tell whether a report computed from the read replica
+now could miss that write. Hits and misses are counted in the cache itself so
+they are shared by all workers using the same backend.
+
+Serialised books are keyed on the book id and ``updated_at``. Every change
+to a book's representation moves its ``updated_at`` (see ``conditional``),
+so a changed book is simply looked up under a new key.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import BookRental
+from .serializers import BookSerializer
+
+KEY_PREFIX = 'rental-report'
+VERSION_KEY = f'{KEY_PREFIX}:version'
+HITS_KEY = f'{KEY_PREFIX}:hits'
+MISSES_KEY = f'{KEY_PREFIX}:misses'
+CACHED_PARAMS = ('email', 'status', 'page', 'page_size', 'pagination', 'cursor')
+BOOK_KEY_PREFIX = 'book'
+
+
+def cache_timeout():
+    """Seconds a report stays cached; 0 disables the cache."""
+    return getattr(settings, 'RENTAL_REPORT_CACHE_TIMEOUT', 60)
+
+
+def _version():
+    # Seed with the clock so a version lost to eviction never reuses an old number.
+    return cache.get_or_set(VERSION_KEY, time.time_ns(), None)
+
+
+def replica_lag():
+    """Seconds the read replica may lag behind the primary."""
+    return getattr(settings, 'REPLICA_LAG_SECONDS', 5)
+
+
+def replica_may_lag():
+    """
+    Return whether the reports were invalidated less than ``replica_lag()``
+    seconds ago, so a report computed on the replica could still miss the
+    write and be cached stale; such reports are computed on the primary.
+    """
+    return _within_lag(cache.get(VERSION_KEY))
+
+
+async def areplica_may_lag():
+    """Async version of ``replica_may_lag``."""
+    return _within_lag(await cache.aget(VERSION_KEY))
+
+
+def _within_lag(version):
+    # A version lost to eviction may hide a recent bump.
+    return version is None or time.time_ns() - version < replica_lag() * 1e9
+
+
+def report_cache_key(request):
+    """Build the cache key for a rental report request."""
+    return _report_key(request, _version())
+
+
+async def areport_cache_key(request):
+    """Async version of ``report_cache_key``."""
+    return _report_key(request, await cache.aget_or_set(VERSION_KEY, time.time_ns(), None))
+
+
+def _report_key(request, version):
+    params = request.query_params
+    normalised = [
+        (name, params.get(name, '').strip().lower() if name == 'status'
+         else params.get(name, '').strip())
+        for name in CACHED_PARAMS
+    ]
+    raw = repr((request.get_host(), normalised)).encode('utf-8')
+    return f'{KEY_PREFIX}:{version}:{hashlib.sha1(raw).hexdigest()}'
+
+
+def get_cached_report(key):
+    """Return the cached report data for ``key`` or ``None``, counting the hit or miss."""
+    data = cache.get(key)
+    _count(HITS_KEY if data is not None else MISSES_KEY)
+    return data
+
+
+async def aget_cached_report(key):
+    """Async version of ``get_cached_report``."""
+    data = await cache.aget(key)
+    await _acount(HITS_KEY if data is not None else MISSES_KEY)
+    return data
+
+
+def set_cached_report(key, data):
+    """Store report data under ``key``."""
+    cache.set(key, data, cache_timeout())
+
+
+async def aset_cached_report(key, data):
+    """Async version of ``set_cached_report``."""
+    await cache.aset(key, data, cache_timeout())
+
+
+def cache_statistics():
+    """Return the hit/miss counters and hit ratio."""
+    counts = cache.get_many([HITS_KEY, MISSES_KEY])
+    hits, misses = counts.get(HITS_KEY, 0), counts.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': hits / total if total else 0,
+    }
+
+
+def invalidate_rental_reports():
+    """
+    Orphan every cached report. Runs immediately and again on commit so a
+    report cached while the write was still uncommitted is discarded too.
+    """
+    _bump_version()
+    transaction.on_commit(_bump_version)
+
+
+def _bump_version():
+    # Nanosecond timestamps do not repeat, so every bump still orphans the
+    # cached reports, and the version also records when it happened.
+    cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+def _count(key):
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass
+
+
+async def _acount(key):
+    await cache.aadd(key, 0, None)
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        pass
+
+
+def book_cache_timeout():
+    """Seconds a serialised book stays cached; 0 disables the cache."""
+    return getattr(settings, 'BOOK_CACHE_TIMEOUT', 3600)
+
+
+def book_cache_key(row):
+    """Build the cache key of the representation of a ``BookSerializer.values`` row."""
+    return f"{BOOK_KEY_PREFIX}:{row['id']}:{row['updated_at'].isoformat()}"
+
+
+def serialize_books(rows):
+    """
+    Return the ``BookSerializer`` output for ``BookSerializer.values`` rows,
+    in order. Cached representations are read with one multi-get; only the
+    misses are built, then stored with one multi-set.
+    """
+    rows = list(rows)
+    timeout = book_cache_timeout()
+    if not timeout:
+        return BookSerializer.represent(rows)
+
+    keys = [book_cache_key(row) for row in rows]
+    cached = cache.get_many(keys) if keys else {}
+    missing = [row for row, key in zip(rows, keys) if key not in cached]
+    if missing:
+        fresh = dict(zip(map(book_cache_key, missing), BookSerializer.represent(missing)))
+        cache.set_many(fresh, timeout)
+        cached.update(fresh)
+    return [cached[key] for key in keys]
+
+
+async def aserialize_books(rows):
+    """Async version of ``serialize_books``."""
+    rows = list(rows)
+    timeout = book_cache_timeout()
+    if not timeout:
+        return await BookSerializer.arepresent(rows)
+
+    keys = [book_cache_key(row) for row in rows]
+    cached = await cache.aget_many(keys) if keys else {}
+    missing = [row for row, key in zip(rows, keys) if key not in cached]
+    if missing:
+        fresh = dict(zip(map(book_cache_key, missing), await BookSerializer.arepresent(missing)))
+        await cache.aset_many(fresh, timeout)
+        cached.update(fresh)
+    return [cached[key] for key in keys]
+
+
+@receiver(post_save, sender=BookRental)
+@receiver(post_delete, sender=BookRental)
+def rental_changed(sender, **kwargs):
+    """Invalidate cached reports when a rental is created, updated or deleted."""
+    invalidate_rental_reports()
@@ -0,0 +1,89 @@
+"""
+Conditional GET support for the book endpoints.
+
+A listing's validators are derived from the number of matching books and
+their latest ``updated_at``, read with one aggregate query, so an unchanged
+listing is answered with 304 Not Modified before anything is serialised.
+Cursor pages are validated from their own rows instead, keeping them free
+of counts.
+Changes that alter a book's representation without saving the book (author
+and language renames, author list changes) bump the book's ``updated_at``
+through the signal handlers below.
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .author_links import changed_book_ids, deleted_author_book_ids
+from .models import Author, Book, Language
+
+
+def listing_state(queryset):
+    """Return the number of books in ``queryset`` and their latest ``updated_at``."""
+    state = queryset.order_by().aggregate(count=Count('*'), last_modified=Max('updated_at'))
+    return state['count'], state['last_modified']
+
+
+def validators(request, state, last_modified):
+    """
+    Return the ``(etag, last_modified)`` validators of the response to
+    ``request`` whose content is determined by ``state``.
+    """
+    raw = repr((request.get_full_path(), request.accepted_media_type, state))
+    etag = f'"{hashlib.sha1(raw.encode("utf-8")).hexdigest()}"'
+    return etag, last_modified and int(last_modified.timestamp())
+
+
+def not_modified(request, etag, last_modified):
+    """Return a 304 response if the request's validators match, else ``None``."""
+    return get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+
+def set_validators(response, etag, last_modified):
+    """Add the ``ETag`` and ``Last-Modified`` headers to ``response``."""
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def touch_books(queryset):
+    """Mark the books in ``queryset`` as changed; returns the new ``updated_at``."""
+    now = timezone.now()
+    queryset.update(updated_at=now)
+    return now
+
+
+@receiver(post_save, sender=Author)
+def author_saved(sender, instance, created, raw=False, **kwargs):
+    """A renamed author changes the representation of every book they wrote."""
+    if not (created or raw):
+        touch_books(Book.objects.filter(authors=instance))
+
+
+@receiver(post_delete, sender=Author)
+def author_deleted(sender, instance, **kwargs):
+    """Mark the books a deleted author was linked to as changed."""
+    touch_books(Book.objects.filter(id__in=deleted_author_book_ids(instance)))
+
+
+@receiver(post_save, sender=Language)
+def language_saved(sender, instance, created, raw=False, **kwargs):
+    """A renamed language changes the representation of its books."""
+    if not (created or raw):
+        touch_books(Book.objects.filter(language=instance))
+
+
+@receiver(m2m_changed, sender=Book.authors.through)
+def book_authors_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Mark books whose author list changed."""
+    book_ids = changed_book_ids(instance, action, reverse, pk_set)
+    if book_ids:
+        now = touch_books(Book.objects.filter(id__in=book_ids))
+        if not reverse:
+            instance.updated_at = now
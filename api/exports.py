@@ -0,0 +1,123 @@
+"""
+Streaming exports of the book catalogue and rental history.
+
+Rows are read with ``values()`` projections through ``QuerySet.iterator``
+and encoded one at a time into the response, so an export of any size runs
+in constant memory. Book authors are looked up once per chunk of books.
+"""
+import csv
+from collections import defaultdict
+from datetime import datetime, time
+from itertools import islice
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Book
+
+CHUNK_SIZE = 2000
+BUFFER_LINES = 200
+OUTPUTS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+BOOK_FIELDS = ('id', 'isbn', 'title', 'authors', 'publication_year', 'language',
+               'is_available', 'amazon_id', 'updated_at')
+RENTAL_FIELDS = ('id', 'book_id', 'book_title', 'borrower_email', 'borrowed_date',
+                 'returned_date', 'updated_at')
+
+
+class ExportError(ValueError):
+    """Raised for invalid export parameters."""
+
+
+def parse_updated_since(value):
+    """Parse the ``updated_since`` parameter (ISO date or datetime); ``None`` if absent."""
+    if not value:
+        return None
+    try:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            day = parse_date(value)
+            parsed = day and datetime.combine(day, time())
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ExportError('updated_since must be an ISO 8601 date or datetime')
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def book_rows(queryset, chunk_size=CHUNK_SIZE):
+    """Yield export rows for the books in ``queryset``, in id order."""
+    values = (queryset.order_by('id')
+              .values('id', 'isbn', 'title', 'publication_year', 'language__name',
+                      'is_available', 'amazon_id', 'updated_at')
+              .iterator(chunk_size=chunk_size))
+    through = Book.authors.through
+    while chunk := list(islice(values, chunk_size)):
+        authors = defaultdict(list)
+        links = (through.objects.using(queryset.db)
+                 .filter(book_id__in=[row['id'] for row in chunk])
+                 .order_by('pk').values_list('book_id', 'author__name'))
+        for book_id, name in links:
+            authors[book_id].append(name)
+        for row in chunk:
+            row['language'] = row.pop('language__name')
+            row['authors'] = authors[row['id']]
+            yield row
+
+
+def rental_rows(queryset, chunk_size=CHUNK_SIZE):
+    """Yield export rows for the rentals in ``queryset``, in id order."""
+    values = (queryset.order_by('id')
+              .values('id', 'book_id', 'book__title', 'borrower_email', 'borrowed_date',
+                      'returned_date', 'updated_at')
+              .iterator(chunk_size=chunk_size))
+    for row in values:
+        row['book_title'] = row.pop('book__title')
+        yield row
+
+
+def _ndjson(rows, fields):
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    for row in rows:
+        yield encoder.encode({field: row[field] for field in fields}) + '\n'
+
+
+class _Echo:
+    """File-like object handing each written CSV line back to the caller."""
+    def write(self, value):
+        return value
+
+
+def _csv(rows, fields):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow([
+            ', '.join(row[field]) if field == 'authors'
+            else row[field].isoformat() if hasattr(row[field], 'isoformat')
+            else row[field]
+            for field in fields
+        ])
+
+
+def _buffered(lines, size=BUFFER_LINES):
+    """Join lines into larger pieces so the server is not handed one write per row."""
+    while piece := ''.join(islice(lines, size)):
+        yield piece
+
+
+def export_response(rows, fields, output, filename):
+    """Stream ``rows`` as NDJSON or CSV; raises ``ExportError`` for other outputs."""
+    if output not in OUTPUTS:
+        raise ExportError(f"output must be one of: {', '.join(OUTPUTS)}")
+    encode = _csv if output == 'csv' else _ndjson
+    response = StreamingHttpResponse(_buffered(encode(rows, fields)),
+                                     content_type=OUTPUTS[output])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{output}"'
+    return response
@@ -0,0 +1,271 @@
+"""
+Set-based CSV import engine for the library catalogue.
+
+Rows are normalised and written a chunk at a time: languages and authors are
+resolved with one lookup per chunk (backed by an in-memory cache for the
+whole import), books are upserted with a single ``bulk_create`` and the
+``Book.authors`` through table is rewritten with one delete and one insert,
+new books get a one-copy inventory, after which the chunk's search index
+entries are refreshed.
+
+Files are streamed (optionally gzip/bz2 compressed) and parsed in chunks,
+optionally across a process pool, and every written chunk records the byte
+offset it ended at so an interrupted import can resume from a checkpoint.
+"""
+import bz2
+import csv
+import gzip
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.db import transaction
+
+from .models import Author, Language, Book, BookInventory
+from .search import index_books
+
+
+def normalise_row(row):
+    """
+    Convert a raw CSV row (dict keyed by the CSV header) into a tuple of
+    ``(id, isbn, title, publication_year, language_name, author_names)``.
+    """
+    language = row['Language'].lower().strip() or None
+    authors = [name.strip() for name in row['Authors'].split(',') if name.strip()]
+    return (
+        int(row['Id']),
+        row['ISBN'].strip(),
+        row['Title'],
+        int(row['Publication Year']),
+        language,
+        authors,
+    )
+
+
+def normalise_chunk(header, rows):
+    """Normalise a chunk of raw CSV rows; runs inside pool workers."""
+    return [normalise_row(dict(zip(header, row))) for row in rows if row]
+
+
+def open_catalogue(path):
+    """Open a CSV file in binary mode, decompressing ``.gz`` and ``.bz2`` files."""
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    if path.endswith('.bz2'):
+        return bz2.open(path, 'rb')
+    return open(path, 'rb')
+
+
+class CatalogueReader:
+    """
+    Streams raw CSV rows from a binary file in chunks.
+    Attributes:
+        header (list): Column names from the first line of the file.
+        position (int): Byte offset (in the decompressed stream) of the end
+            of the last row read.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        header_line = stream.readline()
+        self.header = next(csv.reader([header_line.decode('utf-8-sig')]))
+        self.position = len(header_line)
+
+    def chunks(self, chunk_size, offset=None):
+        """
+        Yield ``(rows, offset)`` pairs where ``offset`` is the byte position
+        just past the last row of the chunk. Reading starts at ``offset``
+        when given, which must be a value previously yielded.
+        """
+        if offset and offset > self.position:
+            self.stream.seek(offset)
+            self.position = offset
+
+        reader = csv.reader(self._lines())
+        chunk = []
+        for row in reader:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield chunk, self.position
+                chunk = []
+        if chunk:
+            yield chunk, self.position
+
+    def _lines(self):
+        for line in iter(self.stream.readline, b''):
+            self.position += len(line)
+            yield line.decode('utf-8')
+
+
+def parse_chunks(reader, chunk_size, workers=1, offset=None):
+    """
+    Yield ``(normalised_rows, offset)`` pairs in file order. With more than
+    one worker, chunks are normalised in a process pool while keeping at
+    most two chunks per worker in flight.
+    """
+    chunks = reader.chunks(chunk_size, offset)
+    if workers <= 1:
+        for rows, end in chunks:
+            yield normalise_chunk(reader.header, rows), end
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+        pending = deque()
+        for rows, end in chunks:
+            pending.append((pool.submit(normalise_chunk, reader.header, rows), end))
+            if len(pending) >= workers * 2:
+                future, done_at = pending.popleft()
+                yield future.result(), done_at
+        while pending:
+            future, done_at = pending.popleft()
+            yield future.result(), done_at
+
+
+class ImportCheckpoint:
+    """
+    Records how far an import of ``source`` has progressed.
+    The checkpoint is a small JSON file written atomically after every
+    committed chunk and removed once the import finishes.
+    """
+
+    def __init__(self, source, path=None):
+        self.source = source
+        self.path = path or f"{source}.checkpoint"
+
+    def _fingerprint(self):
+        stat = os.stat(self.source)
+        return {'size': stat.st_size, 'mtime': stat.st_mtime}
+
+    def load(self):
+        """
+        Return the saved ``{'offset', 'rows'}`` state, or ``None`` when there
+        is no checkpoint. Raises ``ValueError`` if the source file changed.
+        """
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, encoding='utf-8') as checkpoint_file:
+            state = json.load(checkpoint_file)
+        if state.get('fingerprint') != self._fingerprint():
+            raise ValueError(f"{self.source} changed since checkpoint {self.path} was written")
+        return state
+
+    def save(self, offset, rows):
+        """Persist the byte offset and row count reached so far."""
+        state = {'offset': offset, 'rows': rows, 'fingerprint': self._fingerprint()}
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as checkpoint_file:
+            json.dump(state, checkpoint_file)
+        os.replace(temp_path, self.path)
+
+    def clear(self):
+        """Remove the checkpoint after a completed import."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class BulkBookImporter:
+    """
+    Imports normalised book rows using bulk queries.
+    Attributes:
+        chunk_size (int): Number of rows written per transaction.
+        rows_imported (int): Running total of rows written.
+        elapsed (float): Seconds spent writing chunks.
+    """
+    book_update_fields = ['isbn', 'title', 'publication_year', 'language', 'updated_at']
+
+    def __init__(self, chunk_size=5000):
+        self.chunk_size = chunk_size
+        self.rows_imported = 0
+        self.elapsed = 0.0
+        self._languages = {}
+        self._authors = {}
+
+    @property
+    def rows_per_second(self):
+        """Average write throughput so far."""
+        if not self.elapsed:
+            return 0.0
+        return self.rows_imported / self.elapsed
+
+    def import_rows(self, rows):
+        """Write normalised rows chunk by chunk, yielding the row count of each chunk."""
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= self.chunk_size:
+                yield self.import_chunk(chunk)
+                chunk = []
+        if chunk:
+            yield self.import_chunk(chunk)
+
+    def import_chunk(self, rows):
+        """Write one chunk of normalised rows inside a single transaction."""
+        if not rows:
+            return 0
+        started = time.perf_counter()
+        # Later rows win when the same book id appears twice in a chunk.
+        books = {row[0]: row for row in rows}
+
+        with transaction.atomic():
+            languages = self._resolve(
+                Language, self._languages,
+                {row[4] for row in books.values() if row[4]})
+            authors = self._resolve(
+                Author, self._authors,
+                {name for row in books.values() for name in row[5]})
+
+            Book.objects.bulk_create(
+                [
+                    Book(id=book_id, isbn=isbn, title=title, publication_year=year,
+                         language_id=languages.get(language))
+                    for book_id, isbn, title, year, language, _ in books.values()
+                ],
+                update_conflicts=True,
+                unique_fields=['id'],
+                update_fields=self.book_update_fields,
+            )
+
+            # New books start with one copy; existing inventories are kept.
+            BookInventory.objects.bulk_create(
+                [BookInventory(book_id=book_id) for book_id in books],
+                ignore_conflicts=True,
+            )
+
+            through = Book.authors.through
+            through.objects.filter(book_id__in=books.keys()).delete()
+            through.objects.bulk_create(
+                [
+                    through(book_id=book_id, author_id=authors[name])
+                    for book_id, row in books.items()
+                    for name in dict.fromkeys(row[5])
+                ],
+                ignore_conflicts=True,
+            )
+            index_books(books.keys())
+
+        self.rows_imported += len(rows)
+        self.elapsed += time.perf_counter() - started
+        return len(rows)
+
+    @staticmethod
+    def _resolve(model, cache, names):
+        """
+        Map names to primary keys for ``model``, creating missing rows.
+        Costs at most two queries plus one insert per chunk and nothing
+        once every name has been seen.
+        """
+        missing = names - cache.keys()
+        if missing:
+            existing = model.objects.filter(name__in=missing).order_by('pk')
+            for pk, name in existing.values_list('pk', 'name'):
+                cache.setdefault(name, pk)
+            new = missing - cache.keys()
+            if new:
+                model.objects.bulk_create([model(name=name) for name in new])
+                created = model.objects.filter(name__in=new).order_by('pk')
+                for pk, name in created.values_list('pk', 'name'):
+                    cache.setdefault(name, pk)
+        return {name: cache[name] for name in names}
@@ -0,0 +1,244 @@
+"""
+Request performance instrumentation.
+
+``PerformanceMiddleware`` measures a sample of requests (``PERF_SAMPLE_RATE``):
+wall time, number and total time of the SQL queries run, time spent building
+the representations of the rows (``serializing``), time spent rendering the
+response and the response size. Measured responses carry the numbers in a
+``Server-Timing`` header; each endpoint keeps a window of its recent
+measurements, summarised as p50/p95/p99 by ``endpoint_statistics``; requests
+slower than ``PERF_SLOW_REQUEST_MS`` are logged with their slowest SQL
+statements.
+
+Queries are timed by ``record_queries``, an execute wrapper added to every
+database connection as it opens. Outside a measured request it only reads a
+context variable, and the variable follows the request into
+``sync_to_async`` threads, so queries of async views are counted too.
+Measurements are kept in memory: every worker process reports its own.
+"""
+import heapq
+import logging
+import random
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+METRICS = ('total_ms', 'db_ms', 'queries', 'serialize_ms', 'render_ms', 'bytes')
+
+_current = ContextVar('request_metrics', default=None)
+# Endpoint name -> metric -> recent values
+_windows = {}
+
+
+class RequestMetrics:
+    """Measurements of one request, filled in while it runs."""
+
+    def __init__(self, sql_limit):
+        self.started = time.perf_counter()
+        self.render_started = None
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.serialize_seconds = 0.0
+        self.sql_limit = sql_limit
+        # Min-heap of (seconds, sequence, sql) holding the slowest statements
+        self.slowest = []
+
+    def record_query(self, sql, seconds):
+        self.queries += 1
+        self.sql_seconds += seconds
+        if self.sql_limit:
+            entry = (seconds, self.queries, sql)
+            if len(self.slowest) < self.sql_limit:
+                heapq.heappush(self.slowest, entry)
+            else:
+                heapq.heappushpop(self.slowest, entry)
+
+
+def record_queries(execute, sql, params, many, context):
+    """Execute wrapper timing the queries of the request being measured, if any."""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.record_query(sql, time.perf_counter() - started)
+
+
+@contextmanager
+def serializing():
+    """
+    Count the time spent in the block as serialisation of the request being
+    measured, if any. Queries run in the block are also counted as SQL time.
+    """
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.serialize_seconds += time.perf_counter() - started
+
+
+def install(sender, connection, **kwargs):
+    """``connection_created`` handler adding ``record_queries`` to the connection."""
+    if record_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_queries)
+
+
+def endpoint_name(request):
+    """Return ``"<METHOD> <url name>"``, or None for requests no URL matched."""
+    match = getattr(request, 'resolver_match', None)
+    return None if match is None else f"{request.method} {match.view_name}"
+
+
+def record(endpoint, measurement):
+    """Add a request's measurement to its endpoint's window."""
+    window = _windows.get(endpoint)
+    if window is None:
+        size = getattr(settings, 'PERF_WINDOW_SIZE', 1000)
+        window = _windows.setdefault(
+            endpoint, {metric: deque(maxlen=size) for metric in METRICS})
+    for metric, value in measurement.items():
+        if value is not None:
+            window[metric].append(value)
+
+
+def percentiles(values):
+    """Return p50/p95/p99 and the maximum of ``values`` (nearest rank)."""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    last = len(ordered) - 1
+    return {
+        'p50': round(ordered[int(0.50 * last)], 2),
+        'p95': round(ordered[int(0.95 * last)], 2),
+        'p99': round(ordered[int(0.99 * last)], 2),
+        'max': round(ordered[last], 2),
+    }
+
+
+def endpoint_statistics():
+    """Summarise the recent measurements of every endpoint."""
+    statistics = {}
+    for endpoint, window in sorted(_windows.items()):
+        statistics[endpoint] = {'samples': len(window['total_ms'])}
+        for metric in METRICS:
+            statistics[endpoint][metric] = percentiles(list(window[metric]))
+    return statistics
+
+
+def reset_statistics():
+    """Forget every recorded measurement."""
+    _windows.clear()
+
+
+def server_timing(measurement):
+    """Format a measurement as a ``Server-Timing`` header value."""
+    metrics = [
+        f"total;dur={measurement['total_ms']:.1f}",
+        f"db;dur={measurement['db_ms']:.1f};desc=\"{measurement['queries']} queries\"",
+        f"serialize;dur={measurement['serialize_ms']:.1f}",
+        f"render;dur={measurement['render_ms']:.1f}",
+    ]
+    if measurement['bytes'] is not None:
+        metrics.append(f"size;desc=\"{measurement['bytes']} bytes\"")
+    return ', '.join(metrics)
+
+
+def log_slow_request(request, measurement, metrics):
+    """Log a slow request with its slowest SQL statements (without parameters)."""
+    statements = ''.join(f"\n  {seconds * 1000:8.1f} ms  {sql}"
+                         for seconds, _, sql in sorted(metrics.slowest, reverse=True))
+    logger.warning(
+        "Slow request %s %s: %.1f ms, %d queries in %.1f ms, serialize %.1f ms, "
+        "render %.1f ms%s",
+        request.method, request.path, measurement['total_ms'], measurement['queries'],
+        measurement['db_ms'], measurement['serialize_ms'], measurement['render_ms'], statements)
+
+
+class PerformanceMiddleware:
+    """
+    Measure a sample of requests; see the module docstring. Install it first
+    in ``MIDDLEWARE`` so the measurements include the other middleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        metrics = self.start()
+        if metrics is None:
+            return self.get_response(request)
+        token = _current.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = self.start()
+        if metrics is None:
+            return await self.get_response(request)
+        token = _current.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics)
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered right after the template response hooks run.
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.render_started = time.perf_counter()
+        return response
+
+    @staticmethod
+    def start():
+        """Return a new ``RequestMetrics`` if this request is sampled, else None."""
+        rate = getattr(settings, 'PERF_SAMPLE_RATE', 0)
+        if rate <= 0 or (rate < 1 and random.random() >= rate):
+            return None
+        return RequestMetrics(getattr(settings, 'PERF_SLOW_SQL_LIMIT', 10))
+
+    @staticmethod
+    def finish(request, response, metrics):
+        """Record the measurement, add the header and log the request if slow."""
+        finished = time.perf_counter()
+        measurement = {
+            'total_ms': (finished - metrics.started) * 1000,
+            'db_ms': metrics.sql_seconds * 1000,
+            'queries': metrics.queries,
+            'serialize_ms': metrics.serialize_seconds * 1000,
+            'render_ms': ((finished - metrics.render_started) * 1000
+                          if metrics.render_started is not None else 0.0),
+            # Streamed bodies are produced after the middleware returns
+            'bytes': None if response.streaming else len(response.content),
+        }
+        endpoint = endpoint_name(request)
+        if endpoint is not None:
+            record(endpoint, measurement)
+        if getattr(settings, 'PERF_SERVER_TIMING', False):
+            response['Server-Timing'] = server_timing(measurement)
+        slow_ms = getattr(settings, 'PERF_SLOW_REQUEST_MS', 0)
+        if slow_ms and measurement['total_ms'] >= slow_ms:
+            log_slow_request(request, measurement, metrics)
+        return response
@@ -1,42 +1,106 @@
 """
-Import books from a CSV file located at ~/assessment_documents/Backend Data.csv
+Import books from a CSV file (by default ~/assessment_documents/Backend Data.csv)
 """
 import csv
+import io
 import os
-from django.core.management.base import BaseCommand
+import time
+from django.core.management.base import BaseCommand, CommandError
+from api.importers import (
+    BulkBookImporter, CatalogueReader, ImportCheckpoint, open_catalogue, parse_chunks
+)
 from api.models import Author, Language, Book
 
 class Command(BaseCommand):
     help = 'Import books from a CSV file located at assessment_documents/Backend Data.csv'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path', default='assessment_documents/Backend Data.csv',
+            help='CSV file to import; .gz and .bz2 files are decompressed on the fly.')
+        parser.add_argument(
+            '--bulk', action='store_true',
+            help='Use the set-based import engine (bulk inserts, batched transactions).')
+        parser.add_argument(
+            '--chunk-size', type=int, default=5000,
+            help='Rows written per transaction in bulk mode (default: 5000).')
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Processes used to parse and normalise chunks; implies --bulk.')
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Continue from the checkpoint left by an interrupted import; implies --bulk.')
+
     def handle(self, *args, **kwargs):
-        file_path = os.path.expanduser('assessment_documents/Backend Data.csv')
+        file_path = os.path.expanduser(kwargs['path'])
         if not os.path.exists(file_path):
             self.stderr.write(f"File not found: {file_path}")
             return
 
-        with open(file_path, newline='', encoding='utf-8') as csvfile:
-            reader = csv.DictReader(csvfile, delimiter=',')
-            for row in reader:
-                if row['Language'].lower():
-                    language, _ = Language.objects.get_or_create(name=row['Language'].lower().strip())
-                else:
-                    language = None
-
-                authors = row['Authors'].split(',')
-                author_list = []
-                for author_name in authors:
-                    author, _ = Author.objects.get_or_create(name=author_name.strip())
-                    author_list.append(author)
-
-                book, _ = Book.objects.get_or_create(
-                    id=row['Id'],
-                    title=row['Title'],
-                    publication_year=row['Publication Year'],
-                    isbn=row['ISBN'],
-                    language=language
-                    )
-                book.authors.set(author_list)
-                book.save()
-                self.stdout.write(f"Imported book: {book.title} by {', '.join(author.name for author in author_list)}")
+        with open_catalogue(file_path) as stream:
+            if kwargs['bulk'] or kwargs['resume'] or kwargs['workers'] > 1:
+                self.import_bulk(file_path, stream, kwargs['chunk_size'],
+                                 kwargs['workers'], kwargs['resume'])
+            else:
+                csvfile = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+                self.import_rows(csv.DictReader(csvfile, delimiter=','))
         self.stdout.write(self.style.SUCCESS('Successfully imported books from CSV file.'))
+
+    def import_bulk(self, file_path, stream, chunk_size, workers, resume):
+        """
+        Stream the file through the bulk engine, checkpointing after every
+        committed chunk and reporting progress and throughput.
+        """
+        checkpoint = ImportCheckpoint(file_path)
+        offset, rows_done = None, 0
+        if resume:
+            try:
+                state = checkpoint.load()
+            except ValueError as e:
+                raise CommandError(f"{e}; delete the checkpoint or run without --resume.")
+            if state:
+                offset, rows_done = state['offset'], state['rows']
+                self.stdout.write(f"Resuming after {rows_done} rows (byte offset {offset})")
+
+        # Byte progress is only meaningful when offsets match the file on disk.
+        total_bytes = None if file_path.endswith(('.gz', '.bz2')) else os.path.getsize(file_path)
+        importer = BulkBookImporter(chunk_size=chunk_size)
+        reader = CatalogueReader(stream)
+        started = time.perf_counter()
+
+        for rows, offset in parse_chunks(reader, chunk_size, workers, offset):
+            importer.import_chunk(rows)
+            checkpoint.save(offset, rows_done + importer.rows_imported)
+
+            rate = importer.rows_imported / (time.perf_counter() - started)
+            progress = f", {100 * offset / total_bytes:.1f}%" if total_bytes else ""
+            self.stdout.write(
+                f"Imported {rows_done + importer.rows_imported} rows "
+                f"({rate:.0f} rows/s{progress})")
+
+        checkpoint.clear()
+
+    def import_rows(self, reader):
+        """Import rows one at a time with get_or_create."""
+        for row in reader:
+            if row['Language'].lower():
+                language, _ = Language.objects.get_or_create(name=row['Language'].lower().strip())
+            else:
+                language = None
+
+            authors = row['Authors'].split(',')
+            author_list = []
+            for author_name in authors:
+                author, _ = Author.objects.get_or_create(name=author_name.strip())
+                author_list.append(author)
+
+            book, _ = Book.objects.get_or_create(
+                id=row['Id'],
+                title=row['Title'],
+                publication_year=row['Publication Year'],
+                isbn=row['ISBN'],
+                language=language
+                )
+            book.authors.set(author_list)
+            book.save()
+            self.stdout.write(f"Imported book: {book.title} by {', '.join(author.name for author in author_list)}")
@@ -0,0 +1,34 @@
+"""
+Deliver queued wishlist notifications (the WishlistNotification outbox)
+"""
+import time
+from django.core.management.base import BaseCommand
+from api.notifications import process_pending
+
+class Command(BaseCommand):
+    help = 'Send queued wishlist notifications and clear the notified wishlist entries'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Drain the outbox and exit instead of polling forever.')
+        parser.add_argument(
+            '--interval', type=float, default=5.0,
+            help='Seconds to wait between polls when the outbox is empty (default: 5).')
+        parser.add_argument(
+            '--limit', type=int, default=100,
+            help='Outbox entries fetched per poll (default: 100).')
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Subscribers emailed and removed per batch (default: 500).')
+
+    def handle(self, *args, **kwargs):
+        while True:
+            delivered, emails = process_pending(kwargs['limit'], kwargs['batch_size'])
+            if delivered:
+                self.stdout.write(f"Delivered {delivered} notifications ({emails} emails)")
+                continue
+            if kwargs['once']:
+                break
+            time.sleep(kwargs['interval'])
+        self.stdout.write(self.style.SUCCESS('Notification outbox drained.'))
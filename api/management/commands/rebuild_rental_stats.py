@@ -0,0 +1,12 @@
+"""
+Rebuild the daily rental statistics rollup from the rental history
+"""
+from django.core.management.base import BaseCommand
+from api.reports import rebuild_rollup
+
+class Command(BaseCommand):
+    help = 'Rebuild the RentalDailyStat rollup from all BookRental rows'
+
+    def handle(self, *args, **kwargs):
+        count = rebuild_rollup()
+        self.stdout.write(self.style.SUCCESS(f'Wrote {count} rollup rows.'))
@@ -0,0 +1,12 @@
+"""
+Rebuild the full-text search index from the Book and Author tables
+"""
+from django.core.management.base import BaseCommand
+from api.search import rebuild_index
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for book titles and authors'
+
+    def handle(self, *args, **kwargs):
+        count = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} books.'))
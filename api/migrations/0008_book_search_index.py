@@ -0,0 +1,58 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE api_book_fts USING fts5("
+            "title, authors, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        # Title matches weigh twice as much as author matches.
+        schema_editor.execute(
+            "INSERT INTO api_book_fts(api_book_fts, rank) VALUES ('rank', 'bm25(10.0, 5.0)')"
+        )
+        schema_editor.execute(
+            "INSERT INTO api_book_fts(rowid, title, authors) "
+            "SELECT b.id, b.title, COALESCE(("
+            "  SELECT group_concat(a.name, ' ') FROM api_book_authors ba "
+            "  JOIN api_author a ON a.id = ba.author_id WHERE ba.book_id = b.id"
+            "), '') FROM api_book b"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE TABLE api_book_search ("
+            "book_id bigint PRIMARY KEY REFERENCES api_book (id) "
+            "ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+            "document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX api_book_search_document_idx ON api_book_search USING GIN (document)"
+        )
+        schema_editor.execute(
+            "INSERT INTO api_book_search(book_id, document) "
+            "SELECT b.id, setweight(to_tsvector('simple', b.title), 'A') || "
+            "setweight(to_tsvector('simple', COALESCE(("
+            "  SELECT string_agg(a.name, ' ') FROM api_book_authors ba "
+            "  JOIN api_author a ON a.id = ba.author_id WHERE ba.book_id = b.id"
+            "), '')), 'B') FROM api_book b"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS api_book_fts")
+    elif vendor == 'postgresql':
+        schema_editor.execute("DROP TABLE IF EXISTS api_book_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_book_amazon_id'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.1 on 2026-10-17 03:31
+
+from collections import defaultdict
+from datetime import timezone
+
+from django.db import migrations, models
+
+
+def backfill_rental_stats(apps, schema_editor):
+    BookRental = apps.get_model('api', 'BookRental')
+    RentalDailyStat = apps.get_model('api', 'RentalDailyStat')
+    db_alias = schema_editor.connection.alias
+
+    totals = defaultdict(lambda: [0, 0, 0])
+    rentals = BookRental.objects.using(db_alias).values_list(
+        'borrowed_date', 'returned_date', 'borrower_email')
+    for borrowed, returned, email in rentals.iterator(chunk_size=10000):
+        day = borrowed.astimezone(timezone.utc).date()
+        for key in ((day, ''), (day, email)):
+            row = totals[key]
+            row[0] += 1
+            if returned is None:
+                row[1] += 1
+            else:
+                row[2] += (returned - borrowed).days
+
+    RentalDailyStat.objects.using(db_alias).bulk_create(
+        [RentalDailyStat(day=day, borrower_email=email, rentals=rentals,
+                         active_rentals=active, returned_days=days)
+         for (day, email), (rentals, active, days) in totals.items()],
+        batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_book_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RentalDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('borrower_email', models.EmailField(blank=True, default='', max_length=254)),
+                ('rentals', models.IntegerField(default=0)),
+                ('active_rentals', models.IntegerField(default=0)),
+                ('returned_days', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Rental Daily Stat',
+                'verbose_name_plural': 'Rental Daily Stats',
+                'ordering': ['-day'],
+                'constraints': [models.UniqueConstraint(fields=('borrower_email', 'day'), name='unique_rental_daily_stat')],
+            },
+        ),
+        migrations.RunPython(backfill_rental_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.1 on 2026-10-17 03:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_rentaldailystat'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['-created_at', '-id'], name='book_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['is_available', '-created_at', '-id'], name='book_available_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bookrental',
+            index=models.Index(fields=['-borrowed_date', '-id'], name='rental_borrowed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bookrental',
+            index=models.Index(fields=['borrower_email', '-borrowed_date', '-id'], name='rental_borrower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bookrental',
+            index=models.Index(condition=models.Q(('returned_date__isnull', True)), fields=['book', 'borrower_email'], name='rental_active_book_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bookrental',
+            index=models.Index(condition=models.Q(('returned_date__isnull', True)), fields=['-borrowed_date', '-id'], name='rental_active_borrowed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wishlist',
+            index=models.Index(fields=['wishlist_user_email'], name='wishlist_user_email_idx'),
+        ),
+    ]
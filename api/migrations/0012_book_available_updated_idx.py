@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-17 03:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_wishlistnotification'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['is_available', 'updated_at'], name='book_available_updated_idx'),
+        ),
+    ]
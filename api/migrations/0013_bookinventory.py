@@ -0,0 +1,46 @@
+# Generated by Django 5.2.1 on 2026-10-17 04:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_inventory(apps, schema_editor):
+    """Give every existing book one copy, lent out if the book is unavailable."""
+    Book = apps.get_model('api', 'Book')
+    BookInventory = apps.get_model('api', 'BookInventory')
+    db_alias = schema_editor.connection.alias
+
+    books = Book.objects.using(db_alias).order_by().values_list('id', 'is_available')
+    batch = []
+    for book_id, is_available in books.iterator(chunk_size=10000):
+        batch.append(BookInventory(book_id=book_id, total_copies=1,
+                                   available_copies=int(is_available)))
+        if len(batch) >= 10000:
+            BookInventory.objects.using(db_alias).bulk_create(batch, batch_size=1000)
+            batch = []
+    BookInventory.objects.using(db_alias).bulk_create(batch, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_book_available_updated_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookInventory',
+            fields=[
+                ('book', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='inventory', serialize=False, to='api.book')),
+                ('total_copies', models.PositiveIntegerField(default=1)),
+                ('available_copies', models.PositiveIntegerField(default=1)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Book Inventory',
+                'verbose_name_plural': 'Book Inventories',
+                'constraints': [models.CheckConstraint(condition=models.Q(('available_copies__lte', models.F('total_copies'))), name='inventory_available_lte_total')],
+            },
+        ),
+        migrations.RunPython(backfill_inventory, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.1 on 2026-10-17 04:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_bookinventory'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WishlistSubscription',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('book', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='wishlist_subscriptions', to='api.book')),
+                ('wishlist', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='subscriptions', to='api.wishlist')),
+            ],
+            options={
+                'verbose_name': 'Wishlist Subscription',
+                'verbose_name_plural': 'Wishlist Subscriptions',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['book', 'id'], name='wishlist_subscription_book_idx')],
+                'constraints': [models.UniqueConstraint(fields=('wishlist', 'book'), name='unique_wishlist_book')],
+            },
+        ),
+    ]
@@ -0,0 +1,64 @@
+from django.db import migrations
+
+BATCH_SIZE = 10000
+
+
+def copy_wishlist_books(apps, schema_editor):
+    """
+    Copy the wishlist M2M rows into WishlistSubscription, merging the
+    wishlists that share an email into the oldest one first.
+    """
+    Wishlist = apps.get_model('api', 'Wishlist')
+    WishlistSubscription = apps.get_model('api', 'WishlistSubscription')
+    db_alias = schema_editor.connection.alias
+    wishlists = Wishlist.objects.using(db_alias)
+
+    kept = {}
+    merged = {}
+    for pk, email in wishlists.order_by('id').values_list('id', 'wishlist_user_email'):
+        merged[pk] = kept.setdefault(email, pk)
+
+    rows = (Wishlist.books.through.objects.using(db_alias).order_by('id')
+            .values_list('wishlist_id', 'book_id'))
+    batch = []
+    for wishlist_id, book_id in rows.iterator(chunk_size=BATCH_SIZE):
+        batch.append(WishlistSubscription(wishlist_id=merged[wishlist_id], book_id=book_id))
+        if len(batch) >= BATCH_SIZE:
+            WishlistSubscription.objects.using(db_alias).bulk_create(
+                batch, batch_size=1000, ignore_conflicts=True)
+            batch = []
+    WishlistSubscription.objects.using(db_alias).bulk_create(
+        batch, batch_size=1000, ignore_conflicts=True)
+
+    duplicates = [pk for pk, keep in merged.items() if pk != keep]
+    for start in range(0, len(duplicates), 1000):
+        wishlists.filter(id__in=duplicates[start:start + 1000]).delete()
+
+
+def copy_subscriptions_back(apps, schema_editor):
+    """Copy WishlistSubscription rows back into the wishlist M2M."""
+    Wishlist = apps.get_model('api', 'Wishlist')
+    WishlistSubscription = apps.get_model('api', 'WishlistSubscription')
+    db_alias = schema_editor.connection.alias
+    Through = Wishlist.books.through
+
+    rows = (WishlistSubscription.objects.using(db_alias).order_by('id')
+            .values_list('wishlist_id', 'book_id'))
+    batch = []
+    for wishlist_id, book_id in rows.iterator(chunk_size=BATCH_SIZE):
+        batch.append(Through(wishlist_id=wishlist_id, book_id=book_id))
+        if len(batch) >= BATCH_SIZE:
+            Through.objects.using(db_alias).bulk_create(batch, batch_size=1000)
+            batch = []
+    Through.objects.using(db_alias).bulk_create(batch, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_wishlistsubscription'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_wishlist_books, copy_subscriptions_back),
+    ]
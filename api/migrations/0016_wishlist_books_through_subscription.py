@@ -0,0 +1,30 @@
+from django.db import migrations, models
+
+
+# Kept apart from the data copy in 0015 so PostgreSQL does not alter tables
+# with pending trigger events in the same transaction.
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_copy_wishlist_books'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='wishlist',
+            name='books',
+        ),
+        migrations.AddField(
+            model_name='wishlist',
+            name='books',
+            field=models.ManyToManyField(related_name='wishlist_items', through='api.WishlistSubscription', to='api.book'),
+        ),
+        migrations.RemoveIndex(
+            model_name='wishlist',
+            name='wishlist_user_email_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='wishlist',
+            constraint=models.UniqueConstraint(fields=('wishlist_user_email',), name='unique_wishlist_user_email'),
+        ),
+    ]
@@ -3,9 +3,8 @@ This module defines the models for the library management system.
 """
 from django.db import models
 from django.apps import apps
-from django.db.models.signals import pre_save
+from django.db.models.signals import post_save, pre_save
 from django.dispatch import receiver
-from django.core.exceptions import ObjectDoesNotExist
 
 from isbn_field import ISBNField
 
@@ -80,7 +79,8 @@ class Book(models.Model):
         authors (ManyToManyField): Relationship to Author model, allowing multiple authors per book.
         publication_year (int): Year the book was published, stored as a positive integer.
         language (ForeignKey): Relationship to Language model, indicating the language of the book.
-        is_available (bool): Indicates if the book is currently available
+        is_available (bool): Indicates if a copy is currently available; kept in step with
+            ``inventory.available_copies`` and only written when that reaches or leaves zero.
         amazon_id (str): Amazon product identifier for affiliate links.
         created_at (datetime): Timestamp when the book record was created, automatically set on creation.
         updated_at (datetime): Timestamp when the book record was last updated, automatically updated on modification.
@@ -90,6 +90,7 @@ class Book(models.Model):
         verbose_name_plural (str): A human-readable plural name for the model.
     Methods:
         __str__(): Returns the string representation of the book, which includes its ID, title, and ISBN.
+        field_changed(name): Whether a tracked field differs from its loaded or last saved value.
     """
     id = models.BigIntegerField(unique=True, primary_key=True)
     isbn = ISBNField(unique=True, verbose_name="ISBN")
@@ -111,37 +112,153 @@ class Book(models.Model):
         ordering = ['-created_at']
         verbose_name = "Book"
         verbose_name_plural = "Books"
+        indexes = [
+            # Default listing order and its keyset pagination key.
+            models.Index(fields=['-created_at', '-id'], name='book_created_idx'),
+            # Listing filtered by availability.
+            models.Index(fields=['is_available', '-created_at', '-id'],
+                         name='book_available_created_idx'),
+            # Covers the conditional GET validators, with or without the availability filter.
+            models.Index(fields=['is_available', 'updated_at'], name='book_available_updated_idx'),
+        ]
 
     def __str__(self):
         return f"{self.id}. {self.title} ({self.isbn})"
 
+    # Fields whose loaded value is remembered on the instance, so signal handlers
+    # can detect changes to them without re-reading the row.
+    tracked_fields = ('is_available', 'title')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_loaded_values()
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._remember_loaded_values(kwargs.get('update_fields'))
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._remember_loaded_values(kwargs.get('fields'))
+
+    def _remember_loaded_values(self, fields=None):
+        loaded = self.__dict__.setdefault('_loaded_values', {})
+        for name in self.tracked_fields:
+            if name in self.__dict__ and (fields is None or name in fields):
+                loaded[name] = self.__dict__[name]
+
+    def loaded_value(self, name, default=None):
+        """Return the remembered value of a tracked field, or ``default`` if unknown."""
+        return self.__dict__.get('_loaded_values', {}).get(name, default)
+
+    def field_changed(self, name):
+        """
+        Return whether a tracked field differs from its loaded or last saved
+        value; True when that value is unknown, e.g. for unsaved instances.
+        """
+        loaded = self.__dict__.get('_loaded_values', {})
+        return name not in loaded or loaded[name] != getattr(self, name)
+
     def notify_wishlist_users(self):
-        """Notify users when a book becomes available"""
+        """
+        Notify users when a book becomes available.
+        Only queues an outbox entry; the process_notifications worker sends
+        the emails and clears the wishlist entries in batches.
+        """
         if self.is_available:
-            wishlistmodel = apps.get_model('api', 'Wishlist')
-            wishlists = wishlistmodel.objects.filter(books=self)
-            for wishlist in wishlists:
-                email_body = f"NOTIFICATION: The book '{self.title}' is now available!"
-                print("********************************************")
-                print(email_body)
-                print("********************************************")
-                wishlist.books.remove(self)
+            outboxmodel = apps.get_model('api', 'WishlistNotification')
+            outboxmodel.objects.create(book=self)
+
+@receiver(pre_save, sender=Book)
+def book_availability_from_inventory(sender, instance, raw=False, update_fields=None,
+                                     using=None, **kwargs):
+    """
+    Keep the availability flag of a saved book in step with its copy counter:
+    a changed ``is_available`` is replaced by whether a copy is on the shelf,
+    so the flag can only be moved by the rental and inventory services.
+    New books, and books without an inventory row yet, keep the flag given.
+    """
+    if raw or (instance._state.adding and update_fields is None):
+        return
+    if update_fields is not None and 'is_available' not in update_fields:
+        return
+    if not instance.field_changed('is_available'):
+        return
+    copies = (BookInventory.objects.using(using)
+              .filter(book_id=instance.pk)
+              .values_list('available_copies', flat=True)
+              .first())
+    if copies is not None:
+        instance.is_available = copies > 0
 
 @receiver(pre_save, sender=Book)
-def book_availability_changed(sender, instance, **kwargs):
+def book_availability_changed(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Signal handler that triggers notifications when a book becomes available.
+    The previous availability comes from the value remembered when the book
+    was loaded; the row is only read for instances not loaded from the database.
+    """
+    if raw or not instance.is_available:
+        return
+    if update_fields is not None and 'is_available' not in update_fields:
+        return
+    was_available = instance.loaded_value('is_available')
+    if was_available is None:
+        was_available = (Book.objects.using(kwargs.get('using'))
+                         .filter(pk=instance.pk)
+                         .values_list('is_available', flat=True)
+                         .first())
+    if was_available is False:
+        instance.notify_wishlist_users()
+        print("********************************************")
+        print(f"Book '{instance.title}' is now available, notifying users.")
+        print("********************************************")
+
+class BookInventory(models.Model):
     """
-    Signal handler that triggers notifications when a book becomes available
+    Copies of a book owned by the library. Borrowing and returning adjust
+    ``available_copies`` with a single conditional UPDATE of this narrow row,
+    so rentals of a popular title do not rewrite the book itself.
+    Attributes:
+        book (OneToOneField): The book the copies belong to.
+        total_copies (int): Copies the library owns.
+        available_copies (int): Copies not currently lent out.
+        updated_at (datetime): Timestamp of the last change.
     """
-    try:
-        old_instance = Book.objects.get(pk=instance.pk)
-        if not old_instance.is_available and instance.is_available:
-            instance.notify_wishlist_users()
-            print("********************************************")
-            print(f"Book '{instance.title}' is now available, notifying users.")
-            print("********************************************")
-    except ObjectDoesNotExist:
-        # New book instance (no previous data to compare with)
-        pass
+    book = models.OneToOneField(Book, on_delete=models.CASCADE, primary_key=True,
+                                related_name='inventory')
+    total_copies = models.PositiveIntegerField(default=1)
+    available_copies = models.PositiveIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        """
+        Meta options for model configuration
+        """
+        verbose_name = "Book Inventory"
+        verbose_name_plural = "Book Inventories"
+        constraints = [
+            models.CheckConstraint(condition=models.Q(available_copies__lte=models.F('total_copies')),
+                                   name='inventory_available_lte_total'),
+        ]
+
+    def __str__(self):
+        return f"{self.available_copies}/{self.total_copies} copies of {self.book_id}"
+
+@receiver(post_save, sender=Book)
+def create_book_inventory(sender, instance, created, raw=False, using=None, **kwargs):
+    """
+    Give every new book one copy, lent out already if it is created unavailable.
+    Books loaded from fixtures get the same unless the fixture has their row.
+    """
+    if raw:
+        BookInventory.objects.using(using).get_or_create(
+            book_id=instance.pk, defaults={'available_copies': int(instance.is_available)})
+    elif created:
+        BookInventory.objects.using(using).create(
+            book=instance, available_copies=int(instance.is_available))
 
 class BookRental(models.Model):
     """
@@ -169,6 +286,90 @@ class BookRental(models.Model):
         ordering = ['-borrowed_date']
         verbose_name = "Book Rental"
         verbose_name_plural = "Book Rentals"
+        indexes = [
+            # Rental history order, keyset pagination key and date ranges.
+            models.Index(fields=['-borrowed_date', '-id'], name='rental_borrowed_idx'),
+            # Rental history filtered by borrower.
+            models.Index(fields=['borrower_email', '-borrowed_date', '-id'],
+                         name='rental_borrower_idx'),
+            # Active rentals only: return lookups and the active history.
+            models.Index(fields=['book', 'borrower_email'],
+                         condition=models.Q(returned_date__isnull=True),
+                         name='rental_active_book_idx'),
+            models.Index(fields=['-borrowed_date', '-id'],
+                         condition=models.Q(returned_date__isnull=True),
+                         name='rental_active_borrowed_idx'),
+        ]
+
+
+class RentalDailyStat(models.Model):
+    """
+    Daily rollup of rentals, bucketed by the UTC date they were borrowed on.
+    Each day has one row for all borrowers (empty ``borrower_email``) and one
+    row per borrower, maintained incrementally as rentals are created and
+    closed so that reports read O(days) rows instead of O(rentals).
+    Attributes:
+        day (date): UTC date the rentals were borrowed on.
+        borrower_email (str): Borrower the row counts, or empty for all borrowers.
+        rentals (int): Rentals borrowed on the day.
+        active_rentals (int): Those rentals not yet returned.
+        returned_days (int): Sum of whole rental days of the returned ones.
+    """
+    day = models.DateField()
+    borrower_email = models.EmailField(max_length=254, blank=True, default='')
+    rentals = models.IntegerField(default=0)
+    active_rentals = models.IntegerField(default=0)
+    returned_days = models.BigIntegerField(default=0)
+
+    class Meta:
+        """
+        Meta options for model configuration
+        """
+        ordering = ['-day']
+        verbose_name = "Rental Daily Stat"
+        verbose_name_plural = "Rental Daily Stats"
+        constraints = [
+            models.UniqueConstraint(fields=['borrower_email', 'day'],
+                                    name='unique_rental_daily_stat'),
+        ]
+
+    def __str__(self):
+        return f"Rentals on {self.day} for {self.borrower_email or 'all borrowers'}"
+
+
+class WishlistNotification(models.Model):
+    """
+    Outbox entry recording that a book became available and its wishlist
+    subscribers are due a notification.
+    Attributes:
+        book (ForeignKey): The book that became available.
+        created_at (datetime): When the book became available.
+        claimed_at (datetime): When a worker started delivering the entry.
+        processed_at (datetime): When delivery finished; null while pending.
+        attempts (int): Number of delivery attempts that failed.
+        last_error (str): Error raised by the last failed attempt.
+    """
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='notifications')
+    created_at = models.DateTimeField(auto_now_add=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+
+    class Meta:
+        """
+        Meta options for model configuration
+        """
+        ordering = ['id']
+        verbose_name = "Wishlist Notification"
+        verbose_name_plural = "Wishlist Notifications"
+        indexes = [
+            models.Index(fields=['id'], condition=models.Q(processed_at__isnull=True),
+                         name='notification_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"Notification for {self.book_id} ({'sent' if self.processed_at else 'pending'})"
 
 
 class Wishlist(models.Model):
@@ -177,7 +378,8 @@ class Wishlist(models.Model):
     """
     wishlist_user_email = models.EmailField(max_length=254)
     wishlist_user_name = models.CharField(max_length=254)
-    books = models.ManyToManyField(Book, related_name='wishlist_items')
+    books = models.ManyToManyField(Book, through='WishlistSubscription',
+                                   related_name='wishlist_items')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -188,6 +390,46 @@ class Wishlist(models.Model):
         ordering = ['-created_at']
         verbose_name = "Wishlist"
         verbose_name_plural = "Wishlists"
+        constraints = [
+            models.UniqueConstraint(fields=['wishlist_user_email'],
+                                    name='unique_wishlist_user_email'),
+        ]
 
     def __str__(self):
         return f"Wishlist for {self.wishlist_user_email or 'Anonymous'}"
+
+
+class WishlistSubscription(models.Model):
+    """
+    One book on one user's wishlist. The index on ``book`` lets a returned
+    book find its subscribers, and the unique constraint (led by
+    ``wishlist``) lets a user's wishlist be read or cleared, with single
+    indexed queries.
+    Attributes:
+        wishlist (ForeignKey): The subscribing user's wishlist.
+        book (ForeignKey): The book the user is waiting for.
+        created_at (datetime): When the book was added to the wishlist.
+    """
+    # Both lookups are served by the composite indexes below.
+    wishlist = models.ForeignKey(Wishlist, on_delete=models.CASCADE,
+                                 related_name='subscriptions', db_index=False)
+    book = models.ForeignKey(Book, on_delete=models.CASCADE,
+                             related_name='wishlist_subscriptions', db_index=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        """
+        Meta options for model configuration
+        """
+        ordering = ['id']
+        verbose_name = "Wishlist Subscription"
+        verbose_name_plural = "Wishlist Subscriptions"
+        constraints = [
+            models.UniqueConstraint(fields=['wishlist', 'book'], name='unique_wishlist_book'),
+        ]
+        indexes = [
+            models.Index(fields=['book', 'id'], name='wishlist_subscription_book_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.wishlist_id} waiting for {self.book_id}"
@@ -0,0 +1,86 @@
+"""
+Delivery of queued wishlist notifications.
+
+Returning a book only inserts a ``WishlistNotification`` row. The
+``process_notifications`` worker drains that outbox: for each entry it
+reads the book's wishlist subscriptions a batch at a time along the
+``(book, id)`` index, sends the batch over one mail connection and then
+deletes those subscriptions with a single query. Delivery is
+at-least-once; a worker that dies mid-entry is replaced after the claim
+lease expires.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import send_mass_mail
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import WishlistNotification, WishlistSubscription
+
+CLAIM_LEASE = timedelta(minutes=5)
+
+
+def pending_notifications(limit):
+    """Return up to ``limit`` undelivered outbox entries, oldest first."""
+    return list(WishlistNotification.objects
+                .filter(processed_at__isnull=True)
+                .select_related('book')
+                .order_by('id')[:limit])
+
+
+def claim(notification):
+    """Claim an entry for this worker; False if another worker holds it."""
+    now = timezone.now()
+    claimed = (WishlistNotification.objects
+               .filter(pk=notification.pk, processed_at__isnull=True)
+               .filter(Q(claimed_at__isnull=True) | Q(claimed_at__lt=now - CLAIM_LEASE))
+               .update(claimed_at=now))
+    return bool(claimed)
+
+
+def deliver(notification, batch_size):
+    """
+    Email every subscriber waiting for the entry's book and remove the book
+    from their wishlists. Returns the number of emails sent. Nothing is sent
+    if the book has been borrowed again in the meantime.
+    """
+    book = notification.book
+    book.refresh_from_db(fields=['is_available'])
+    if not book.is_available:
+        return 0
+
+    subject = f"'{book.title}' is now available"
+    body = f"NOTIFICATION: The book '{book.title}' is now available!"
+    entries = WishlistSubscription.objects.filter(book_id=book.pk).order_by('id')
+    sent = 0
+    while True:
+        batch = list(entries.values_list('id', 'wishlist__wishlist_user_email')[:batch_size])
+        if not batch:
+            return sent
+        send_mass_mail(
+            [(subject, body, settings.DEFAULT_FROM_EMAIL, [email]) for _, email in batch],
+            fail_silently=False)
+        WishlistSubscription.objects.filter(id__in=[pk for pk, _ in batch]).delete()
+        sent += len(batch)
+
+
+def process_pending(limit=100, batch_size=500):
+    """
+    Deliver up to ``limit`` pending entries. Returns ``(delivered, emails)``.
+    Failed entries are released for a later attempt with the error recorded.
+    """
+    delivered = emails = 0
+    for notification in pending_notifications(limit):
+        if not claim(notification):
+            continue
+        try:
+            emails += deliver(notification, batch_size)
+        except Exception as e:
+            WishlistNotification.objects.filter(pk=notification.pk).update(
+                claimed_at=None, attempts=F('attempts') + 1, last_error=str(e))
+            continue
+        WishlistNotification.objects.filter(pk=notification.pk).update(
+            processed_at=timezone.now())
+        delivered += 1
+    return delivered, emails
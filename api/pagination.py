@@ -0,0 +1,173 @@
+"""
+Pagination classes for the API.
+"""
+import base64
+import json
+from datetime import datetime
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage, Paginator
+from django.db.models import Q
+from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class CustomPagination(pagination.PageNumberPagination):
+    """Custom pagination class for rental history"""
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    # Total already counted by the caller; skips the paginator's COUNT query
+    known_count = None
+
+    def django_paginator_class(self, object_list, per_page):
+        paginator = Paginator(object_list, per_page)
+        if self.known_count is not None:
+            paginator.count = self.known_count
+        return paginator
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Async version of ``paginate_queryset``, querying through the async ORM"""
+        self.request = request
+        page_size = self.get_page_size(request)
+        self.known_count = await queryset.acount()
+        paginator = self.django_paginator_class(queryset, page_size)
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)))
+        return [row async for row in self.page.object_list.aiterator()]
+
+
+class KeysetPagination(pagination.BasePagination):
+    """
+    Cursor pagination over a stable, unique key such as ``('-created_at', '-id')``.
+    Each page is fetched with a range condition on the key of the last row
+    seen, so fetching page N costs the same as page 1 and no total count is
+    run. Clients opt in per request with ``?pagination=cursor`` and follow
+    the ``next``/``previous`` links.
+    """
+    page_size = CustomPagination.page_size
+    page_size_query_param = CustomPagination.page_size_query_param
+    max_page_size = CustomPagination.max_page_size
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, ordering):
+        self.ordering = tuple(ordering)
+
+    @classmethod
+    def requested(cls, request):
+        """Return True when the request asks for cursor pagination."""
+        return (request.query_params.get('pagination') == 'cursor'
+                or cls.cursor_query_param in request.query_params)
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self._finish_page(list(self._page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Async version of ``paginate_queryset``, querying through the async ORM"""
+        queryset = self._page_queryset(queryset, request)
+        return self._finish_page([row async for row in queryset.aiterator()])
+
+    def _page_queryset(self, queryset, request):
+        """Return the query fetching the requested page plus one row"""
+        self.request = request
+        self.page_size_requested = self.get_page_size(request)
+        self.position, self.reverse = self.decode_cursor(request, queryset.model)
+
+        ordering = ([self._flip(field) for field in self.ordering] if self.reverse
+                    else self.ordering)
+        queryset = queryset.order_by(*ordering)
+        if self.position is not None:
+            queryset = queryset.filter(self._after(self.position, self.reverse))
+        return queryset[:self.page_size_requested + 1]
+
+    def _finish_page(self, rows):
+        page_size, position, reverse = self.page_size_requested, self.position, self.reverse
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        self.next_position = self.previous_position = None
+        if rows:
+            if has_more or reverse:
+                self.next_position = self._position(rows[-1])
+            if position is not None and (has_more or not reverse):
+                self.previous_position = self._position(rows[0])
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position, reverse=False)
+
+    def get_previous_link(self):
+        if self.previous_position is None:
+            return None
+        return self.encode_cursor(self.previous_position, reverse=True)
+
+    def encode_cursor(self, position, reverse):
+        values = [value.isoformat() if isinstance(value, datetime) else value
+                  for value in position]
+        payload = json.dumps({'p': values, 'r': reverse}, separators=(',', ':'))
+        cursor = base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request, model):
+        """Return the ``(position, reverse)`` encoded in the request's cursor."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            values = payload['p']
+            if len(values) != len(self.ordering):
+                raise ValueError
+            position = tuple(
+                model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, values))
+            return position, bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def _position(self, obj):
+        if isinstance(obj, dict):
+            # Rows of a values() queryset
+            return tuple(obj[field.lstrip('-')] for field in self.ordering)
+        return tuple(getattr(obj, field.lstrip('-')) for field in self.ordering)
+
+    def _after(self, position, reverse):
+        """Build the condition selecting rows that sort after ``position``."""
+        condition = Q()
+        equal = {}
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            descending = field.startswith('-') != reverse
+            condition |= Q(**equal, **{f"{name}__{'lt' if descending else 'gt'}": value})
+            equal[name] = value
+        return condition
+
+    @staticmethod
+    def _flip(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
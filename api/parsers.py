@@ -0,0 +1,35 @@
+"""
+Parsers for the API.
+"""
+import json
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+class JSONLinesParser(BaseParser):
+    """
+    Parses a JSON Lines body (one JSON value per line) into an iterator over
+    its values. The request stream is read a line at a time as the iterator
+    is consumed, so a malformed line raises ``ParseError`` only when reached.
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if stream is None:
+            return iter(())
+        return self.values(stream, encoding)
+
+    @staticmethod
+    def values(stream, encoding):
+        for number, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line.decode(encoding))
+            except ValueError as exc:
+                raise ParseError(f'JSON Lines parse error on line {number} - {exc}')
@@ -0,0 +1,32 @@
+"""
+Renderers for the API.
+"""
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSON renderer backed by orjson, producing the same bytes as DRF's
+    ``JSONRenderer`` for compact output. Datetimes and other types orjson
+    would format differently go through DRF's encoder. Indented output,
+    ASCII-only output, values orjson rejects, and environments without orjson
+    fall back to ``JSONRenderer``.
+    """
+    options = 0 if orjson is None else (orjson.OPT_PASSTHROUGH_DATETIME
+                                        | orjson.OPT_NON_STR_KEYS)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (orjson is None or data is None or self.ensure_ascii or not self.compact
+                or self.get_indent(accepted_media_type, renderer_context or {}) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=self.options)
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Match JSONRenderer, which escapes these for JavaScript compatibility
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
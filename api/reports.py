@@ -0,0 +1,239 @@
+"""
+Rental report queries: filtering and statistics over ``BookRental``.
+
+Statistics are served from the ``RentalDailyStat`` rollup, which
+``record_borrow``/``record_return`` keep up to date; ``rental_statistics``
+computes the same figures live from ``BookRental``.
+"""
+from collections import Counter, defaultdict
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.db import IntegrityError, transaction
+from django.db.models import Avg, Count, F, FloatField, Func, IntegerField, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .caching import invalidate_rental_reports
+from .models import BookRental, RentalDailyStat
+
+
+class RentalDays(Func):
+    """
+    Whole days between ``borrowed_date`` and ``returned_date`` of a rental,
+    matching ``(returned_date - borrowed_date).days`` in Python.
+    """
+    template = 'EXTRACT(DAY FROM (%(expressions)s))'
+    arg_joiner = ' - '
+    output_field = IntegerField()
+
+    def __init__(self, **extra):
+        super().__init__(F('returned_date'), F('borrowed_date'), **extra)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # julianday() is a float; round to the millisecond before flooring so
+        # exact multiples of a day are not truncated to the day before.
+        return self.as_sql(
+            compiler, connection,
+            template='(CAST(ROUND((julianday(%(expressions)s)) * 86400000) AS INTEGER) / 86400000)',
+            arg_joiner=') - julianday(',
+            **extra_context)
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        clone = self.copy()
+        clone.set_source_expressions(self.get_source_expressions()[::-1])
+        return super(RentalDays, clone).as_sql(
+            compiler, connection, template='TIMESTAMPDIFF(DAY, %(expressions)s)',
+            arg_joiner=', ', **extra_context)
+
+
+def filter_rentals(queryset, params):
+    """Apply the rental report's ``email`` and ``status`` query parameters."""
+    email = params.get('email')
+    if email:
+        queryset = queryset.filter(borrower_email=email)
+
+    status_param = params.get('status')
+    if status_param:
+        if status_param.lower() == 'active':
+            queryset = queryset.filter(returned_date__isnull=True)
+        elif status_param.lower() == 'returned':
+            queryset = queryset.filter(returned_date__isnull=False)
+    return queryset
+
+
+def report_periods(now=None):
+    """Return the ``(start_of_year, start_of_month, start_of_week)`` boundaries."""
+    now = now or timezone.now()
+    start_of_year = now.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
+    start_of_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    start_of_week = now - timedelta(days=now.weekday())
+    return start_of_year, start_of_month, start_of_week
+
+
+def rental_statistics(rentals, now=None):
+    """Compute the rental report statistics for ``rentals`` in one aggregate query."""
+    return _finish_statistics(rentals.order_by().aggregate(**_statistics_aggregates(now)))
+
+
+async def arental_statistics(rentals, now=None):
+    """Async version of ``rental_statistics``."""
+    return _finish_statistics(await rentals.order_by().aaggregate(**_statistics_aggregates(now)))
+
+
+def _statistics_aggregates(now):
+    start_of_year, start_of_month, start_of_week = report_periods(now)
+    return {
+        'total_rentals': Count('pk'),
+        'currently_rented': Count('pk', filter=Q(returned_date__isnull=True)),
+        'this_year_rentals': Count('pk', filter=Q(borrowed_date__gte=start_of_year)),
+        'this_month_rentals': Count('pk', filter=Q(borrowed_date__gte=start_of_month)),
+        'this_week_rentals': Count('pk', filter=Q(borrowed_date__gte=start_of_week)),
+        'average_rental_days': Avg(
+            RentalDays(), filter=Q(returned_date__isnull=False), output_field=FloatField()),
+    }
+
+
+def _finish_statistics(stats):
+    if stats['average_rental_days'] is None:
+        stats['average_rental_days'] = 0
+    return stats
+
+
+def rollup_day(value):
+    """Return the UTC date a rental borrowed at ``value`` is bucketed under."""
+    return value.astimezone(dt_timezone.utc).date()
+
+
+def _bump_rollup(rentals, deltas):
+    """
+    Add ``deltas(rental)`` to the all-borrowers and per-borrower rows of each
+    rental's day, with one UPDATE per affected row. Rows are updated in
+    ``(day, borrower_email)`` order so concurrent writers lock them in the
+    same order.
+    """
+    totals = defaultdict(Counter)
+    for rental in rentals:
+        day = rollup_day(rental.borrowed_date)
+        for email in ('', rental.borrower_email):
+            totals[day, email].update(deltas(rental))
+
+    for (day, email), row_deltas in sorted(totals.items()):
+        changes = {field: F(field) + delta for field, delta in row_deltas.items()}
+        rows = RentalDailyStat.objects.filter(day=day, borrower_email=email)
+        if rows.update(**changes):
+            continue
+        try:
+            with transaction.atomic():
+                RentalDailyStat.objects.create(day=day, borrower_email=email, **row_deltas)
+        except IntegrityError:
+            # Another request created the row first; apply the change to it.
+            rows.update(**changes)
+
+
+def record_borrow(rental):
+    """Count a newly created rental in the rollup."""
+    record_borrows([rental])
+
+
+def record_borrows(rentals):
+    """Count newly created rentals in the rollup."""
+    _bump_rollup(rentals, lambda rental: {'rentals': 1, 'active_rentals': 1})
+
+
+def record_return(rental):
+    """Move a rental that has just been returned from active to returned in the rollup."""
+    record_returns([rental])
+
+
+def record_returns(rentals):
+    """Move rentals that have just been returned from active to returned in the rollup."""
+    _bump_rollup(rentals, lambda rental: {
+        'active_rentals': -1,
+        'returned_days': (rental.returned_date - rental.borrowed_date).days,
+    })
+
+
+def rebuild_rollup():
+    """Recompute the whole rollup from ``BookRental``; returns the number of rows written."""
+    day = TruncDate('borrowed_date', tzinfo=dt_timezone.utc)
+    counts = {
+        'rentals': Count('pk'),
+        'active_rentals': Count('pk', filter=Q(returned_date__isnull=True)),
+        'returned_days': Sum(RentalDays(), filter=Q(returned_date__isnull=False)),
+    }
+    rentals = BookRental.objects.order_by().annotate(rollup_day=day)
+    totals = rentals.values('rollup_day').annotate(**counts)
+    per_borrower = rentals.values('rollup_day', 'borrower_email').annotate(**counts)
+
+    with transaction.atomic():
+        RentalDailyStat.objects.all().delete()
+        rows = [
+            RentalDailyStat(
+                day=row['rollup_day'], borrower_email=row.get('borrower_email', ''),
+                rentals=row['rentals'], active_rentals=row['active_rentals'],
+                returned_days=row['returned_days'] or 0)
+            for group in (totals, per_borrower) for row in group.iterator()
+        ]
+        RentalDailyStat.objects.bulk_create(rows, batch_size=1000)
+    invalidate_rental_reports()
+    return len(rows)
+
+
+def rollup_statistics(params, now=None):
+    """
+    Compute the rental report statistics for the report's query parameters
+    from the rollup. Reads one row per day; the partial first day of the
+    week is counted live with a small range query.
+    """
+    rows, aggregates, first_week_day = _rollup_queries(params, now)
+    return _finish_rollup(params, rows.aggregate(**aggregates), first_week_day.count())
+
+
+async def arollup_statistics(params, now=None):
+    """Async version of ``rollup_statistics``."""
+    rows, aggregates, first_week_day = _rollup_queries(params, now)
+    return _finish_rollup(params, await rows.aaggregate(**aggregates),
+                          await first_week_day.acount())
+
+
+def _rollup_queries(params, now):
+    """Return the rollup rows, their aggregates and the partial first week day's rentals."""
+    start_of_year, start_of_month, start_of_week = report_periods(now)
+    status_param = (params.get('status') or '').lower()
+    if status_param == 'active':
+        counted = F('active_rentals')
+    elif status_param == 'returned':
+        counted = F('rentals') - F('active_rentals')
+    else:
+        counted = F('rentals')
+
+    week_day = rollup_day(start_of_week)
+    rows = RentalDailyStat.objects.filter(borrower_email=params.get('email') or '').order_by()
+    aggregates = {
+        'total_rentals': Sum(counted),
+        'currently_rented': Sum('active_rentals'),
+        'this_year_rentals': Sum(counted, filter=Q(day__gte=rollup_day(start_of_year))),
+        'this_month_rentals': Sum(counted, filter=Q(day__gte=rollup_day(start_of_month))),
+        'this_week_rentals': Sum(counted, filter=Q(day__gt=week_day)),
+        'returned_rentals': Sum(F('rentals') - F('active_rentals')),
+        'returned_days': Sum('returned_days'),
+    }
+    next_midnight = datetime.combine(week_day + timedelta(days=1), time(), tzinfo=dt_timezone.utc)
+    first_week_day = filter_rentals(BookRental.objects.all(), params).filter(
+        borrowed_date__gte=start_of_week, borrowed_date__lt=next_midnight)
+    return rows, aggregates, first_week_day
+
+
+def _finish_rollup(params, totals, first_week_day_rentals):
+    status_param = (params.get('status') or '').lower()
+    totals = {key: value or 0 for key, value in totals.items()}
+    totals['this_week_rentals'] += first_week_day_rentals
+
+    if status_param == 'returned':
+        totals['currently_rented'] = 0
+    returned_rentals = totals.pop('returned_rentals')
+    returned_days = totals.pop('returned_days')
+    totals['average_rental_days'] = 0
+    if returned_rentals and status_param != 'active':
+        totals['average_rental_days'] = returned_days / returned_rentals
+    return totals
@@ -0,0 +1,86 @@
+"""
+Database routing for the read replica.
+
+Reads go to the primary unless they run inside ``read_from_replica()``, or a
+view decorated with ``replica_reads``, and ``settings.REPLICA_DATABASE`` is
+configured. Only the heavy read endpoints (book list, rental report and the
+exports) opt in, so writes and the reads that must see them (borrow, return,
+the wishlist) never depend on replication lag. Reads made while a transaction
+is open on the primary, or inside ``read_from_primary()``, stay there as
+well. The flag lives in a context variable, so it follows a request into
+``sync_to_async`` threads but not into other requests.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from inspect import iscoroutinefunction
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+def replica_alias():
+    """Return the replica's database alias, or ``None`` if none is configured."""
+    alias = getattr(settings, 'REPLICA_DATABASE', None)
+    return alias if alias in connections.settings else None
+
+
+@contextmanager
+def read_from_replica():
+    """Send the reads made inside the block to the replica, if there is one."""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+@contextmanager
+def read_from_primary():
+    """Keep the reads made inside the block on the primary, even in a replica view."""
+    token = _replica_reads.set(False)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def replica_reads(view):
+    """Run a (sync or async) view inside ``read_from_replica()``."""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def wrapper(*args, **kwargs):
+            with read_from_replica():
+                return await view(*args, **kwargs)
+    else:
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            with read_from_replica():
+                return view(*args, **kwargs)
+    return wrapper
+
+
+def pinned(queryset):
+    """
+    Bind ``queryset`` to the database it reads from now, for querysets that
+    are evaluated after the view returns (streaming responses).
+    """
+    return queryset.using(queryset.db)
+
+
+class ReplicaRouter:
+    """Route reads to the replica inside ``read_from_replica()``."""
+
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get() and not connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return replica_alias()
+        return None
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary.
+        return True
@@ -0,0 +1,233 @@
+"""
+Full-text search over book titles and author names.
+
+On SQLite the index is the FTS5 virtual table ``api_book_fts`` (rowid = book
+id) and on PostgreSQL it is ``api_book_search``, a weighted ``tsvector`` per
+book behind a GIN index. Both are created by migration 0008 and kept in sync
+by the signal handlers below. Other databases fall back to ``icontains``.
+"""
+import re
+from collections import defaultdict
+
+from django.db import connections, router
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .author_links import changed_book_ids, deleted_author_book_ids
+from .models import Author, Book
+
+SQLITE_TABLE = 'api_book_fts'
+POSTGRES_TABLE = 'api_book_search'
+POSTGRES_DOCUMENT = (
+    "setweight(to_tsvector('simple', %s), 'A') || "
+    "setweight(to_tsvector('simple', %s), 'B')"
+)
+BATCH_SIZE = 500
+
+
+def search_backend(connection):
+    """Return the search backend name for a connection, or ``None`` if unsupported."""
+    if connection.vendor in ('sqlite', 'postgresql'):
+        return connection.vendor
+    return None
+
+
+def tokenize(text):
+    """Split user input into lower-cased word tokens safe to embed in a query."""
+    return re.findall(r'\w+', text.lower())
+
+
+def build_match(backend, query=None, title=None, author=None):
+    """
+    Build the backend's match expression, treating every token as a prefix.
+    ``query`` matches any column while ``title`` and ``author`` are scoped to
+    their column. Returns ``None`` when the input contains no tokens.
+    """
+    if backend == 'sqlite':
+        groups = []
+        for column, text in ((None, query), ('title', title), ('authors', author)):
+            terms = ' AND '.join(f'"{token}"*' for token in tokenize(text or ''))
+            if terms:
+                groups.append(f'{column} : ({terms})' if column else f'({terms})')
+        return ' AND '.join(groups) or None
+
+    terms = []
+    for weight, text in (('', query), ('A', title), ('B', author)):
+        terms.extend(f'{token}:*{weight}' for token in tokenize(text or ''))
+    return ' & '.join(terms) or None
+
+
+def filter_books(queryset, params):
+    """Apply the book listing's ``is_available``, ``q``, ``title`` and ``author`` parameters."""
+    query = params.get('q', None)
+    title = params.get('title', None)
+    author = params.get('author', None)
+    is_available = params.get('is_available', None)
+
+    if is_available is not None:
+        is_available = is_available.lower() == 'true'
+        queryset = queryset.filter(is_available=is_available)
+
+    if query or title or author:
+        queryset = search_books(queryset, query=query, title=title, author=author)
+
+    return queryset
+
+
+def search_books(queryset, query=None, title=None, author=None):
+    """
+    Restrict ``queryset`` to books matching the search terms, best match
+    first. Each match is annotated with ``search_rank`` (lower is better).
+    """
+    backend = search_backend(connections[queryset.db])
+    if backend is None:
+        return _search_books_fallback(queryset, query, title, author)
+
+    match = build_match(backend, query, title, author)
+    if match is None:
+        return queryset.none()
+
+    book_id = f'"{Book._meta.db_table}"."id"'
+    if backend == 'sqlite':
+        matches = f"SELECT rowid FROM {SQLITE_TABLE} WHERE {SQLITE_TABLE} MATCH %s"
+        rank = (f"SELECT rank FROM {SQLITE_TABLE} "
+                f"WHERE {SQLITE_TABLE} MATCH %s AND rowid = {book_id}")
+    else:
+        tsquery = "to_tsquery('simple', %s)"
+        matches = f"SELECT book_id FROM {POSTGRES_TABLE} WHERE document @@ {tsquery}"
+        rank = (f"SELECT -ts_rank(document, {tsquery}) FROM {POSTGRES_TABLE} "
+                f"WHERE book_id = {book_id}")
+
+    return (queryset
+            .filter(id__in=RawSQL(matches, [match]))
+            .annotate(search_rank=RawSQL(rank, [match]))
+            .order_by('search_rank', '-created_at'))
+
+
+def _search_books_fallback(queryset, query, title, author):
+    if query:
+        queryset = queryset.filter(Q(title__icontains=query) | Q(authors__name__icontains=query))
+    if title:
+        queryset = queryset.filter(title__icontains=title)
+    if author:
+        queryset = queryset.filter(authors__name__icontains=author)
+    return queryset.distinct()
+
+
+def index_books(book_ids, using=None):
+    """(Re)build the index entries for the given book ids."""
+    using = using or router.db_for_write(Book)
+    connection = connections[using]
+    backend = search_backend(connection)
+    book_ids = list(book_ids)
+    if backend is None or not book_ids:
+        return
+
+    through = Book.authors.through
+    for start in range(0, len(book_ids), BATCH_SIZE):
+        batch = book_ids[start:start + BATCH_SIZE]
+        titles = dict(Book.objects.using(using).filter(id__in=batch).values_list('id', 'title'))
+        authors = defaultdict(list)
+        links = (through.objects.using(using).filter(book_id__in=titles.keys())
+                 .order_by('pk').values_list('book_id', 'author__name'))
+        for book_id, name in links:
+            authors[book_id].append(name)
+        rows = [(book_id, title, ' '.join(authors[book_id])) for book_id, title in titles.items()]
+
+        _delete_entries(connection, backend, batch)
+        with connection.cursor() as cursor:
+            if backend == 'sqlite':
+                cursor.executemany(
+                    f"INSERT INTO {SQLITE_TABLE}(rowid, title, authors) VALUES (%s, %s, %s)",
+                    rows)
+            else:
+                cursor.executemany(
+                    f"INSERT INTO {POSTGRES_TABLE}(book_id, document) "
+                    f"VALUES (%s, {POSTGRES_DOCUMENT})",
+                    rows)
+
+
+def remove_books(book_ids, using=None):
+    """Drop the index entries for the given book ids."""
+    using = using or router.db_for_write(Book)
+    connection = connections[using]
+    backend = search_backend(connection)
+    book_ids = list(book_ids)
+    if backend is None:
+        return
+    for start in range(0, len(book_ids), BATCH_SIZE):
+        _delete_entries(connection, backend, book_ids[start:start + BATCH_SIZE])
+
+
+def rebuild_index(using=None):
+    """Rebuild the whole index from the ``Book`` and ``Author`` tables."""
+    using = using or router.db_for_write(Book)
+    connection = connections[using]
+    backend = search_backend(connection)
+    if backend is None:
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SQLITE_TABLE if backend == 'sqlite' else POSTGRES_TABLE}")
+    book_ids = Book.objects.using(using).order_by().values_list('id', flat=True)
+    count = 0
+    batch = []
+    for book_id in book_ids.iterator(chunk_size=BATCH_SIZE):
+        batch.append(book_id)
+        if len(batch) >= BATCH_SIZE:
+            index_books(batch, using)
+            count += len(batch)
+            batch = []
+    index_books(batch, using)
+    return count + len(batch)
+
+
+def _delete_entries(connection, backend, book_ids):
+    if not book_ids:
+        return
+    placeholders = ', '.join(['%s'] * len(book_ids))
+    with connection.cursor() as cursor:
+        if backend == 'sqlite':
+            cursor.execute(f"DELETE FROM {SQLITE_TABLE} WHERE rowid IN ({placeholders})", book_ids)
+        else:
+            cursor.execute(
+                f"DELETE FROM {POSTGRES_TABLE} WHERE book_id IN ({placeholders})", book_ids)
+
+
+@receiver(post_save, sender=Book)
+def book_saved(sender, instance, created, using, update_fields=None, raw=False, **kwargs):
+    """Reindex a book when its title may have changed."""
+    if raw or (update_fields is not None and 'title' not in update_fields):
+        return
+    if not created and not instance.field_changed('title'):
+        return
+    index_books([instance.pk], using)
+
+
+@receiver(post_delete, sender=Book)
+def book_deleted(sender, instance, using, **kwargs):
+    """Drop a deleted book from the index."""
+    remove_books([instance.pk], using)
+
+
+@receiver(post_save, sender=Author)
+def author_saved(sender, instance, created, using, raw=False, **kwargs):
+    """Reindex every book of a renamed author."""
+    if created or raw:
+        return
+    index_books(instance.books.using(using).values_list('id', flat=True), using)
+
+
+@receiver(post_delete, sender=Author)
+def author_deleted(sender, instance, using, **kwargs):
+    """Reindex the books a deleted author was linked to."""
+    index_books(deleted_author_book_ids(instance), using)
+
+
+@receiver(m2m_changed, sender=Book.authors.through)
+def book_authors_changed(sender, instance, action, reverse, pk_set, using, **kwargs):
+    """Reindex books whose author list changed."""
+    book_ids = changed_book_ids(instance, action, reverse, pk_set)
+    if book_ids:
+        index_books(book_ids, using)
@@ -1,9 +1,22 @@
 """
 This module contains serializers for the API.
+
+``BookSerializer`` and ``BookRentalSerializer`` also provide a read-only
+fast path for the list endpoints: ``values`` projects a queryset onto the
+columns the output needs and ``represent`` builds the serializer's exact
+output from those rows as plain dicts, without model instances or
+per-field serializer calls.
 """
+from collections import defaultdict
+
+from django.db.models import Prefetch
+from django.utils import timezone
 from rest_framework import serializers
 from .models import Book, Wishlist, BookRental
 
+# Formats datetimes exactly as the serializers' DateTimeFields do
+datetime_field = serializers.DateTimeField()
+
 
 class BookSerializer(serializers.ModelSerializer):
     authors = serializers.StringRelatedField(many=True)
@@ -13,6 +26,57 @@ class BookSerializer(serializers.ModelSerializer):
         model = Book
         exclude = ['created_at', 'updated_at']
 
+    value_fields = ('id', 'isbn', 'title', 'publication_year', 'is_available', 'amazon_id',
+                    'language__name', 'created_at', 'updated_at')
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Load the related rows rendered by this serializer in a fixed number of queries"""
+        return queryset.select_related('language').prefetch_related('authors')
+
+    @classmethod
+    def values(cls, queryset):
+        """Project ``queryset`` onto the columns ``represent`` needs"""
+        return queryset.values(*cls.value_fields)
+
+    @classmethod
+    def represent(cls, rows):
+        """Build the serializer's output for ``values`` rows; loads the authors in one query"""
+        rows = list(rows)
+        return cls.build(rows, cls.author_links(rows))
+
+    @classmethod
+    async def arepresent(cls, rows):
+        """Async version of ``represent``"""
+        rows = list(rows)
+        return cls.build(rows, [link async for link in cls.author_links(rows)])
+
+    @staticmethod
+    def author_links(rows):
+        """Query the ``(book_id, author name)`` pairs of ``rows``"""
+        # Same order as the authors prefetch, which follows Author's default ordering
+        return (Book.authors.through.objects
+                .filter(book_id__in=[row['id'] for row in rows])
+                .order_by('-author__created_at')
+                .values_list('book_id', 'author__name'))
+
+    @staticmethod
+    def build(rows, author_links):
+        """Assemble the output dicts from ``values`` rows and their author links"""
+        authors = defaultdict(list)
+        for book_id, name in author_links:
+            authors[book_id].append(name)
+        return [{
+            'id': row['id'],
+            'authors': authors[row['id']],
+            'language': row['language__name'],
+            'isbn': row['isbn'],
+            'title': row['title'],
+            'publication_year': row['publication_year'],
+            'is_available': row['is_available'],
+            'amazon_id': row['amazon_id'],
+        } for row in rows]
+
 
 class WishlistSerializer(serializers.ModelSerializer):
     books = BookSerializer(many=True, read_only=True)
@@ -21,6 +85,12 @@ class WishlistSerializer(serializers.ModelSerializer):
         model = Wishlist
         fields = ['id', 'books']
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Load the related rows rendered by this serializer in a fixed number of queries"""
+        books = BookSerializer.setup_eager_loading(Book.objects.all())
+        return queryset.prefetch_related(Prefetch('books', queryset=books))
+
 
 class BookRentalSerializer(serializers.ModelSerializer):
     book_title = serializers.CharField(source='book.title', read_only=True)
@@ -30,13 +100,63 @@ class BookRentalSerializer(serializers.ModelSerializer):
         model = BookRental
         fields = ['id', 'book_title', 'borrower_email',
                   'borrowed_date', 'returned_date', 'rental_duration']
+
+    value_fields = ('id', 'book__title', 'borrower_email', 'borrowed_date', 'returned_date')
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Load the related rows rendered by this serializer in a fixed number of queries"""
+        return queryset.select_related('book')
+
+    @classmethod
+    def values(cls, queryset):
+        """Project ``queryset`` onto the columns ``represent`` needs"""
+        return queryset.values(*cls.value_fields)
+
+    @staticmethod
+    def represent(rows):
+        """Build the serializer's output for ``values`` rows"""
+        now = timezone.now()
+        return [{
+            'id': row['id'],
+            'book_title': row['book__title'],
+            'borrower_email': row['borrower_email'],
+            'borrowed_date': datetime_field.to_representation(row['borrowed_date']),
+            'returned_date': datetime_field.to_representation(row['returned_date']),
+            'rental_duration': ((row['returned_date'] or now) - row['borrowed_date']).days,
+        } for row in rows]
+
     def get_rental_duration(self, obj):
         if obj.returned_date:
             return (obj.returned_date - obj.borrowed_date).days
-        from django.utils import timezone
         return (timezone.now() - obj.borrowed_date).days
 
 
+class BulkRentalSerializer(serializers.Serializer):
+    """Serializer for borrowing or returning several books at once"""
+    max_books = 100
+    email = serializers.EmailField()
+    book_ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False,
+                                     max_length=max_books)
+
+
+class WishlistRemoveSerializer(serializers.Serializer):
+    """Serializer for removing one book (``book_id``) or several (``book_ids``) from a wishlist"""
+    email = serializers.EmailField()
+    book_id = serializers.IntegerField(required=False)
+    book_ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False,
+                                     required=False)
+
+    def validate(self, attrs):
+        """Accept ``book_id`` as a one-item ``book_ids``"""
+        book_id = attrs.pop('book_id', None)
+        if 'book_ids' not in attrs:
+            if book_id is None:
+                raise serializers.ValidationError({'book_ids': 'This field is required.'})
+            attrs['book_ids'] = [book_id]
+        return attrs
+
+
 class AmazonIdUpdateSerializer(serializers.Serializer):
     """Serializer for updating Amazon IDs of books"""
     book_id = serializers.IntegerField()
@@ -48,10 +168,15 @@ class AmazonIdUpdateSerializer(serializers.Serializer):
             raise serializers.ValidationError("Amazon ID cannot be empty")
         return value.strip()
 
-    def validate_book_id(self, value):
-        """Validate that the book exists"""
-        try:
-            Book.objects.get(id=value)
-            return value
-        except Book.DoesNotExist:
-            raise serializers.ValidationError("Book not found")
+    @classmethod
+    def validate_stream(cls, items):
+        """
+        Yield the validated data of ``items`` one at a time as they are
+        consumed; the first invalid item raises ``ValidationError`` with its
+        position (counted from 1) and errors.
+        """
+        for number, item in enumerate(items, start=1):
+            serializer = cls(data=item)
+            if not serializer.is_valid():
+                raise serializers.ValidationError({'item': number, 'errors': serializer.errors})
+            yield serializer.validated_data
@@ -0,0 +1,306 @@
+"""
+Write operations shared by the API views.
+
+Each rental operation is one transaction built on conditional UPDATEs, so the
+database arbitrates concurrent requests: of two requests borrowing a book's
+last copy, exactly one UPDATE matches ``available_copies > 0`` and the other
+changes nothing and is rejected. The counter lives in ``BookInventory``; the
+book row is only written when its availability flag flips.
+"""
+from itertools import islice
+
+from django.db import connections, router, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .caching import invalidate_rental_reports
+from .models import Book, BookInventory, BookRental, WishlistNotification
+from .reports import record_borrow, record_borrows, record_return, record_returns
+
+
+class RentalError(Exception):
+    """Raised when a borrow or return cannot be carried out."""
+
+
+class InventoryError(Exception):
+    """Raised when a book's number of copies cannot be changed."""
+
+
+def _set_availability(book, available, now):
+    """
+    Set ``book.is_available`` to ``available`` if its copy counter agrees,
+    writing the book row only on that transition. Returns True if it changed.
+    """
+    copies = ({'inventory__available_copies__gt': 0} if available
+              else {'inventory__available_copies': 0})
+    changed = Book.objects.filter(pk=book.pk, is_available=not available, **copies).update(
+        is_available=available, updated_at=now)
+    if changed:
+        book.is_available = available
+        book.updated_at = now
+    return bool(changed)
+
+
+def _create_inventories(book_ids):
+    """
+    Give the books of ``book_ids`` that have no copy counter one, as
+    ``create_book_inventory`` would have had they not been inserted with
+    ``bulk_create``. Returns the ids of the books given one.
+    """
+    missing = [BookInventory(book_id=book_id, available_copies=int(available))
+               for book_id, available in Book.objects.filter(
+                   pk__in=book_ids, inventory__isnull=True).values_list('pk', 'is_available')]
+    BookInventory.objects.bulk_create(missing, ignore_conflicts=True)
+    return [inventory.book_id for inventory in missing]
+
+
+def _return_copies(book_ids, now):
+    """
+    Put back one copy of each book of ``book_ids``. Raises ``RentalError``
+    if a counter has no copy out, i.e. it is out of step with the rentals.
+    """
+    def increment(ids):
+        return BookInventory.objects.filter(
+            book_id__in=ids, available_copies__lt=F('total_copies')
+        ).update(available_copies=F('available_copies') + 1, updated_at=now)
+
+    book_ids = list(book_ids)
+    returned = increment(book_ids)
+    if returned < len(book_ids):
+        created = _create_inventories(book_ids)
+        if created:
+            returned += increment(created)
+    if returned < len(book_ids):
+        raise RentalError('The copy count of the book does not match its rentals.')
+
+
+def borrow_book(book, borrower_email):
+    """
+    Lend a copy of ``book`` to ``borrower_email`` and return the new rental.
+    Costs one UPDATE of the copy counter and one INSERT plus the rollup
+    update; the book row is only written when its last copy is lent.
+    """
+    with transaction.atomic():
+        now = timezone.now()
+
+        def claim():
+            return BookInventory.objects.filter(book_id=book.pk, available_copies__gt=0).update(
+                available_copies=F('available_copies') - 1, updated_at=now)
+
+        claimed = claim()
+        if not claimed and _create_inventories([book.pk]):
+            claimed = claim()
+        if not claimed:
+            raise RentalError('Book is not available for borrowing at the moment.')
+
+        rental = BookRental.objects.create(book=book, borrower_email=borrower_email)
+        record_borrow(rental)
+        _set_availability(book, False, now)
+    return rental
+
+
+def return_book(book, borrower_email):
+    """
+    Close the borrower's active rental of ``book``, put the copy back and
+    return the closed rental.
+    """
+    with transaction.atomic():
+        now = timezone.now()
+        rental = BookRental.objects.filter(
+            book=book, borrower_email=borrower_email, returned_date__isnull=True
+        ).order_by().first()
+        # A concurrent return of the same rental makes this UPDATE match nothing.
+        if rental is None or not BookRental.objects.filter(
+                pk=rental.pk, returned_date__isnull=True).update(
+                    returned_date=now, updated_at=now):
+            raise RentalError('No active rental found for this book and email')
+
+        rental.returned_date = now
+        # Lock the counter before the rollup rows, in the same order as
+        # borrow_book, so a concurrent borrow and return cannot deadlock.
+        _return_copies([book.pk], now)
+        record_return(rental)
+        invalidate_rental_reports()
+
+        # Only the return that brings back the first copy notifies the wishlist.
+        if _set_availability(book, True, now):
+            book.notify_wishlist_users()
+    return rental
+
+
+def _unique(book_ids, errors):
+    """
+    Return the ids listed once in ``book_ids``. Books listed more than once
+    are not handled at all: each is reported once in ``errors`` instead.
+    """
+    counts = {}
+    for book_id in book_ids:
+        counts[book_id] = counts.get(book_id, 0) + 1
+    for book_id, count in counts.items():
+        if count > 1:
+            errors.append({'book_id': book_id, 'error': 'Book listed more than once'})
+    return [book_id for book_id, count in counts.items() if count == 1]
+
+
+def borrow_books(book_ids, borrower_email):
+    """
+    Lend one copy of each listed book to ``borrower_email``. Returns
+    ``(borrowed, errors)``: ``{'book_id', 'rental_id'}`` entries for the books
+    lent and ``{'book_id', 'error'}`` entries for the others.
+    Whatever the number of books, costs one locking SELECT of their
+    inventories, one UPDATE of the counters, one INSERT of the rentals, one
+    UPDATE of the books whose last copy went and the rollup updates.
+    """
+    errors = []
+    book_ids = _unique(book_ids, errors)
+    with transaction.atomic():
+        now = timezone.now()
+        copies = dict(BookInventory.objects.select_for_update()
+                      .filter(book_id__in=book_ids).order_by('book_id')
+                      .values_list('book_id', 'available_copies'))
+        missing = [book_id for book_id in book_ids if book_id not in copies]
+        if missing and _create_inventories(missing):
+            copies.update(BookInventory.objects.select_for_update()
+                          .filter(book_id__in=missing).order_by('book_id')
+                          .values_list('book_id', 'available_copies'))
+        lendable = []
+        for book_id in book_ids:
+            if book_id not in copies:
+                errors.append({'book_id': book_id, 'error': 'Book not found'})
+            elif not copies[book_id]:
+                errors.append({'book_id': book_id,
+                               'error': 'Book is not available for borrowing at the moment.'})
+            else:
+                lendable.append(book_id)
+        if not lendable:
+            return [], errors
+
+        # The locked rows all have a copy left, so every one of them should
+        # match; SQLite ignores the lock, so a shortfall is checked anyway.
+        claimed = BookInventory.objects.filter(book_id__in=lendable, available_copies__gt=0).update(
+            available_copies=F('available_copies') - 1, updated_at=now)
+        if claimed != len(lendable):
+            raise RentalError('Some of the books were lent to someone else meanwhile; try again.')
+        rentals = BookRental.objects.bulk_create(
+            [BookRental(book_id=book_id, borrower_email=borrower_email) for book_id in lendable])
+        record_borrows(rentals)
+        Book.objects.filter(
+            pk__in=lendable, is_available=True, inventory__available_copies=0
+        ).update(is_available=False, updated_at=now)
+        # bulk_create sends no post_save, which would otherwise do this.
+        invalidate_rental_reports()
+
+    return [{'book_id': rental.book_id, 'rental_id': rental.pk} for rental in rentals], errors
+
+
+def return_books(book_ids, borrower_email):
+    """
+    Close the borrower's active rental of each listed book. Returns
+    ``(returned, errors)`` like ``borrow_books``. Books that become available
+    queue their wishlist notifications, one outbox entry per book.
+    """
+    errors = []
+    book_ids = _unique(book_ids, errors)
+    with transaction.atomic():
+        now = timezone.now()
+        rentals = {}
+        active = (BookRental.objects.select_for_update()
+                  .filter(book_id__in=book_ids, borrower_email=borrower_email,
+                          returned_date__isnull=True)
+                  .order_by('-id'))
+        for rental in active:
+            # The oldest active rental of a book is the one returned.
+            rentals[rental.book_id] = rental
+        for book_id in book_ids:
+            if book_id not in rentals:
+                errors.append({'book_id': book_id,
+                               'error': 'No active rental found for this book and email'})
+        returned = [rentals[book_id] for book_id in book_ids if book_id in rentals]
+        if not returned:
+            return [], errors
+
+        BookRental.objects.filter(pk__in=[rental.pk for rental in returned]).update(
+            returned_date=now, updated_at=now)
+        for rental in returned:
+            rental.returned_date = now
+        _return_copies(rentals.keys(), now)
+        record_returns(returned)
+
+        available = list(Book.objects.select_for_update(of=('self',))
+                         .filter(pk__in=rentals.keys(), is_available=False,
+                                 inventory__available_copies__gt=0)
+                         .values_list('pk', flat=True))
+        if available:
+            Book.objects.filter(pk__in=available).update(is_available=True, updated_at=now)
+            WishlistNotification.objects.bulk_create(
+                [WishlistNotification(book_id=book_id) for book_id in available])
+        invalidate_rental_reports()
+
+    return [{'book_id': rental.book_id, 'rental_id': rental.pk} for rental in returned], errors
+
+
+def set_copies(book, total_copies):
+    """
+    Change the number of copies the library owns of ``book``. Copies on loan
+    stay lent, so ``total_copies`` may not drop below their number.
+    """
+    if total_copies < 0:
+        raise InventoryError('The number of copies cannot be negative.')
+    with transaction.atomic():
+        now = timezone.now()
+        # SET expressions see the old values: available moves by the change in total.
+        changed = BookInventory.objects.filter(
+            book_id=book.pk, total_copies__lte=total_copies + F('available_copies')
+        ).update(available_copies=F('available_copies') + total_copies - F('total_copies'),
+                 total_copies=total_copies, updated_at=now)
+        if not changed:
+            raise InventoryError('Cannot own fewer copies than are on loan.')
+
+        if _set_availability(book, True, now):
+            book.notify_wishlist_users()
+        else:
+            _set_availability(book, False, now)
+
+
+def update_amazon_ids(items, batch_size=1000):
+    """
+    Set the Amazon ID of many books. ``items`` is an iterable of validated
+    ``{'book_id', 'amazon_id'}`` dicts, consumed a batch at a time; returns
+    ``(updated_books, errors)`` in the endpoint's response format. Each batch costs one ``id__in``
+    lookup and one ``executemany`` UPDATE; per-instance signals are not sent.
+    """
+    using = router.db_for_write(Book)
+    connection = connections[using]
+    table = connection.ops.quote_name(Book._meta.db_table)
+    sql = f"UPDATE {table} SET amazon_id = %s, updated_at = %s WHERE id = %s"
+    # auto_now only applies to save(), so updated_at is set explicitly.
+    now = Book._meta.get_field('updated_at').get_db_prep_value(timezone.now(), connection)
+
+    updated_books = []
+    errors = []
+    with transaction.atomic(using=using):
+        for batch in _batched(items, batch_size):
+            titles = dict(Book.objects.using(using)
+                          .filter(id__in={item['book_id'] for item in batch})
+                          .values_list('id', 'title'))
+            rows = []
+            for item in batch:
+                if item['book_id'] not in titles:
+                    errors.append({'book_id': item['book_id'], 'error': 'Book not found'})
+                    continue
+                rows.append((item['amazon_id'], now, item['book_id']))
+                updated_books.append({
+                    'book_id': item['book_id'],
+                    'title': titles[item['book_id']],
+                    'amazon_id': item['amazon_id'],
+                })
+            if rows:
+                with connection.cursor() as cursor:
+                    cursor.executemany(sql, rows)
+    return updated_books, errors
+
+
+def _batched(items, size):
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
@@ -2,26 +2,54 @@
 URL configuration for library api app.
 """
 from django.urls import path
+from rest_framework.parsers import JSONParser
 
-from api.views import BookViewSet, WishlistViewSet
+from api import async_views
+from api.parsers import JSONLinesParser
+from api.views import BookViewSet, PerformanceViewSet, WishlistViewSet
 
 urlpatterns = [
     path('wishlist/', WishlistViewSet.as_view(
-        {'post': 'add_book', 'delete': 'remove_book'}
+        {'get': 'list', 'post': 'add_book', 'delete': 'remove_book'}
         ), name='wishlist'),
     path('books/', BookViewSet.as_view(
         {'get': 'list'}
         ), name='books'),
+    path('books/<int:pk>/', BookViewSet.as_view(
+        {'get': 'retrieve'}
+        ), name='book-detail'),
+    path('books/export/', BookViewSet.as_view(
+        {'get': 'export'}
+        ), name='books-export'),
     path('books/<int:pk>/borrow/', BookViewSet.as_view(
         {'post': 'borrow'}
         ), name='borrow-book'),
     path('books/<int:pk>/return/', BookViewSet.as_view(
         {'post': 'return_book'}
         ), name='return-book'),
+    path('books/borrow/', BookViewSet.as_view(
+        {'post': 'bulk_borrow'}
+        ), name='bulk-borrow'),
+    path('books/return/', BookViewSet.as_view(
+        {'post': 'bulk_return'}
+        ), name='bulk-return'),
     path('books/rental-report/', BookViewSet.as_view(
         {'get': 'rental_report'}
         ), name='rental-report'),
+    path('books/rental-report/export/', BookViewSet.as_view(
+        {'get': 'rental_report_export'}
+        ), name='rental-report-export'),
+    path('books/rental-report/cache-stats/', BookViewSet.as_view(
+        {'get': 'rental_report_cache_stats'}
+        ), name='rental-report-cache-stats'),
     path('books/update-amazon-ids/', BookViewSet.as_view(
-        {'post': 'update_amazon_ids'}
+        {'post': 'update_amazon_ids'}, parser_classes=[JSONParser, JSONLinesParser]
         ), name='update-amazon-ids'),
+    path('performance/', PerformanceViewSet.as_view(
+        {'get': 'list'}
+        ), name='performance'),
+    # Async versions of the read endpoints, for ASGI deployments
+    path('async/books/', async_views.book_list, name='async-books'),
+    path('async/books/rental-report/', async_views.rental_report,
+         name='async-rental-report'),
 ]
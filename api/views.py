@@ -1,27 +1,37 @@
 """
 Api views for handling book search, wishlist management, and rentals.
 """
-from datetime import timedelta
-from django.utils import timezone
-from django.db import transaction
-from rest_framework import status, viewsets, pagination
+from collections.abc import Iterator
+from contextlib import nullcontext
+
+from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
 
-from .models import Book, Wishlist, BookRental
+from . import services
+from .caching import (
+    cache_statistics, cache_timeout, get_cached_report, replica_may_lag, report_cache_key,
+    serialize_books,
+    set_cached_report
+)
+from .conditional import listing_state, not_modified, set_validators, validators
+from .exports import (
+    BOOK_FIELDS, RENTAL_FIELDS, ExportError, book_rows, export_response,
+    parse_updated_since, rental_rows
+)
+from .instrumentation import endpoint_statistics, serializing
+from .models import Book, Wishlist, BookRental, WishlistSubscription
+from .pagination import CustomPagination, KeysetPagination
+from .reports import filter_rentals, rental_statistics, rollup_statistics
+from .routers import pinned, read_from_primary, replica_reads
+from .search import filter_books
 from .serializers import (
     BookSerializer, WishlistSerializer, BookRentalSerializer,
-    AmazonIdUpdateSerializer
+    AmazonIdUpdateSerializer, BulkRentalSerializer, WishlistRemoveSerializer
 )
 
 
-class CustomPagination(pagination.PageNumberPagination):
-    """Custom pagination class for rental history"""
-    page_size = 10
-    page_size_query_param = 'page_size'
-    max_page_size = 100
-
-
 class BookViewSet(viewsets.ModelViewSet):
     """
     ViewSet for managing books and searching
@@ -29,25 +39,75 @@ class BookViewSet(viewsets.ModelViewSet):
     serializer_class = BookSerializer
     queryset = Book.objects.all()
     pagination_class = CustomPagination
+    cursor_ordering = ('-created_at', '-id')
+    rental_cursor_ordering = ('-borrowed_date', '-id')
+
+    @property
+    def paginator(self):
+        """Page-number pagination by default, keyset pagination on request"""
+        if not hasattr(self, '_paginator'):
+            self._paginator = self.get_paginator(self.cursor_ordering)
+        return self._paginator
+
+    def get_paginator(self, cursor_ordering):
+        """Return the paginator selected by the request's query parameters"""
+        if KeysetPagination.requested(self.request):
+            return KeysetPagination(ordering=cursor_ordering)
+        return self.pagination_class()
 
     def get_queryset(self):
-        queryset = Book.objects.all()
-        title = self.request.query_params.get('title', None)
-        author = self.request.query_params.get('author', None)
-        is_available = self.request.query_params.get('is_available', None)
-
-        if is_available is not None:
-            is_available = is_available.lower() == 'true'
-            queryset = queryset.filter(is_available=is_available)
-
-        if title and author:
-            queryset = queryset.filter(title__icontains=title, authors__name__icontains=author)
-        elif title and not author:
-            queryset = queryset.filter(title__icontains=title)
-        elif author and not title:
-            queryset = queryset.filter(authors__name__icontains=author)
-
-        return queryset.distinct()
+        if self.action in ('borrow', 'return_book'):
+            # Rental actions only read the book row itself
+            return Book.objects.all()
+        queryset = self.filter_books(Book.objects.all())
+        if self.action in ('list', 'retrieve'):
+            # Read-only fast path: plain rows, authors loaded for cache misses only
+            return BookSerializer.values(queryset)
+        return BookSerializer.setup_eager_loading(queryset)
+
+    def filter_books(self, queryset):
+        """Apply the listing's availability and search query parameters"""
+        return filter_books(queryset, self.request.query_params)
+
+    @replica_reads
+    def list(self, request, *args, **kwargs):
+        """List books, answering 304 without serialising when the listing is unchanged"""
+        page = None
+        if isinstance(self.paginator, KeysetPagination):
+            # Validate a cursor page by its own rows so no count is run
+            page = self.paginate_queryset(self.get_queryset())
+            state = ([(row['id'], row['updated_at']) for row in page],
+                     self.paginator.get_next_link(), self.paginator.get_previous_link())
+            last_modified = max((row['updated_at'] for row in page), default=None)
+        else:
+            count, last_modified = listing_state(self.filter_books(Book.objects.all()))
+            self.paginator.known_count = count
+            state = (count, last_modified)
+
+        etag, last_modified = validators(request, state, last_modified)
+        response = not_modified(request, etag, last_modified)
+        if response is None:
+            if page is None:
+                page = self.paginate_queryset(self.get_queryset())
+            with serializing():
+                books = serialize_books(page)
+            response = self.get_paginated_response(books)
+        return set_validators(response, etag, last_modified)
+
+    def retrieve(self, request, *args, **kwargs):
+        """Get a single book, answering 304 when it is unchanged"""
+        count, last_modified = listing_state(Book.objects.filter(pk=kwargs['pk']))
+        if not count:
+            return Response({
+                'error': 'Book not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+        etag, last_modified = validators(request, last_modified, last_modified)
+        response = not_modified(request, etag, last_modified)
+        if response is None:
+            with serializing():
+                book = serialize_books(self.get_queryset().filter(pk=kwargs['pk']))[0]
+            response = Response(book)
+        return set_validators(response, etag, last_modified)
 
     @action(detail=True, methods=['post'])
     def borrow(self, request, pk=None):
@@ -66,15 +126,12 @@ class BookViewSet(viewsets.ModelViewSet):
                     'error': 'Book is not available for borrowing at the moment.'
                 }, status=status.HTTP_400_BAD_REQUEST)
 
-            # Create rental record
-            BookRental.objects.create(
-                book=book,
-                borrower_email=borrower_email
-            )
-
-            # Update book availability
-            book.is_available = False
-            book.save()
+            try:
+                services.borrow_book(book, borrower_email)
+            except services.RentalError as e:
+                return Response({
+                    'error': str(e)
+                }, status=status.HTTP_400_BAD_REQUEST)
 
             return Response({
                 'message': f"Book '{book.title}' has been borrowed by {borrower_email}"
@@ -97,30 +154,15 @@ class BookViewSet(viewsets.ModelViewSet):
                     'error': 'Email is required'
                 }, status=status.HTTP_400_BAD_REQUEST)
 
-            if book.is_available:
-                return Response({
-                    'error': 'Book is already returned and available for borrowing.'
-                }, status=status.HTTP_400_BAD_REQUEST)
-
-            # Update rental record
-            rental = BookRental.objects.filter(
-                book=book,
-                borrower_email=borrower_email,
-                returned_date__isnull=True
-            ).first()
-
-            if not rental:
+            # An available book may still have other copies on loan, so the
+            # service decides whether this borrower has one to return.
+            try:
+                services.return_book(book, borrower_email)
+            except services.RentalError as e:
                 return Response({
-                    'error': 'No active rental found for this book and email'
+                    'error': str(e)
                 }, status=status.HTTP_400_BAD_REQUEST)
 
-            rental.returned_date = timezone.now()
-            rental.save()
-
-            # Update book availability
-            book.is_available = True
-            book.save()
-
             return Response({
                 'message': f"Book '{book.title}' has been returned by {borrower_email}"
             }, status=status.HTTP_200_OK)
@@ -130,54 +172,74 @@ class BookViewSet(viewsets.ModelViewSet):
                 'error': 'Book not found'
             }, status=status.HTTP_404_NOT_FOUND)
 
+    @action(detail=False, methods=['post'])
+    def bulk_borrow(self, request):
+        """Borrow several books for one borrower, reporting the outcome per book"""
+        serializer = BulkRentalSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            borrowed, errors = services.borrow_books(serializer.validated_data['book_ids'],
+                                                     serializer.validated_data['email'])
+        except services.RentalError as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'borrowed': borrowed,
+            'errors': errors
+        }, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'])
+    def bulk_return(self, request):
+        """Return several books for one borrower, reporting the outcome per book"""
+        serializer = BulkRentalSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            returned, errors = services.return_books(serializer.validated_data['book_ids'],
+                                                     serializer.validated_data['email'])
+        except services.RentalError as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'returned': returned,
+            'errors': errors
+        }, status=status.HTTP_200_OK)
+
     @action(detail=False, methods=['get'])
+    @replica_reads
     def rental_report(self, request):
         """Get a detailed report of all book rentals with statistics"""
-        # Get current date and time
-        now = timezone.now()
-        start_of_year = now.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
-        start_of_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        start_of_week = now - timedelta(days=now.weekday())
-
-        # Base queryset
-        rentals = BookRental.objects.all()
-        
-        # Filter by email if provided
-        email = request.query_params.get('email')
-        if email:
-            rentals = rentals.filter(borrower_email=email)
-
-        # Filter by status if provided
-        status_param = request.query_params.get('status')
-        if status_param:
-            if status_param.lower() == 'active':
-                rentals = rentals.filter(returned_date__isnull=True)
-            elif status_param.lower() == 'returned':
-                rentals = rentals.filter(returned_date__isnull=False)
-
-        # Calculate statistics
-        stats = {
-            'total_rentals': rentals.count(),
-            'currently_rented': rentals.filter(returned_date__isnull=True).count(),
-            'this_year_rentals': rentals.filter(borrowed_date__gte=start_of_year).count(),
-            'this_month_rentals': rentals.filter(borrowed_date__gte=start_of_month).count(),
-            'this_week_rentals': rentals.filter(borrowed_date__gte=start_of_week).count(),
-            'average_rental_days': 0  # Will be calculated below
-        }
-
-        # Calculate average rental duration for completed rentals
-        completed_rentals = rentals.filter(returned_date__isnull=False)
-        if completed_rentals.exists():
-            total_days = 0
-            for rental in completed_rentals:
-                duration = (rental.returned_date - rental.borrowed_date).days
-                total_days += duration
-            stats['average_rental_days'] = total_days / completed_rentals.count()
-
-        # Paginate the rental history
-        paginator = self.pagination_class()
-        paginated_rentals = paginator.paginate_queryset(rentals.order_by('-borrowed_date'), request)
-        rental_data = BookRentalSerializer(paginated_rentals, many=True).data
+        live = request.query_params.get('live', '').lower() == 'true'
+        # live=true asks for figures fresh from the history, so it is never cached
+        use_cache = cache_timeout() > 0 and not live
+        if use_cache:
+            cache_key = report_cache_key(request)
+            cached = get_cached_report(cache_key)
+            if cached is not None:
+                return Response(cached, headers={'X-Cache': 'HIT'})
+
+        # A cached report outlives replication lag, so right after an
+        # invalidation it is computed on the primary
+        with read_from_primary() if use_cache and replica_may_lag() else nullcontext():
+            rentals = filter_rentals(BookRental.objects.all(), request.query_params)
+
+            # Read statistics from the daily rollup, or compute them live on request
+            if live:
+                stats = rental_statistics(rentals)
+            else:
+                stats = rollup_statistics(request.query_params)
+
+            # Paginate the rental history
+            paginator = self.get_paginator(self.rental_cursor_ordering)
+            paginated_rentals = paginator.paginate_queryset(
+                BookRentalSerializer.values(rentals.order_by('-borrowed_date')), request)
+            with serializing():
+                rental_data = BookRentalSerializer.represent(paginated_rentals)
 
         # Prepare the response
         response_data = {
@@ -185,35 +247,63 @@ class BookViewSet(viewsets.ModelViewSet):
             'rental_history': rental_data
         }
 
-        return paginator.get_paginated_response(response_data)
+        response = paginator.get_paginated_response(response_data)
+        if use_cache:
+            set_cached_report(cache_key, response.data)
+            response['X-Cache'] = 'MISS'
+        return response
 
-    @action(detail=False, methods=['post'])
-    @transaction.atomic
-    def update_amazon_ids(self, request):
-        """Update Amazon IDs for multiple books"""
-        serializer = AmazonIdUpdateSerializer(data=request.data, many=True)
-        if not serializer.is_valid():
-            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    @action(detail=False, methods=['get'])
+    @replica_reads
+    def export(self, request):
+        """Stream every book matching the listing filters as NDJSON or CSV"""
+        try:
+            books = self.filter_books(Book.objects.all())
+            updated_since = parse_updated_since(request.query_params.get('updated_since'))
+            if updated_since:
+                books = books.filter(updated_at__gte=updated_since)
+            return export_response(book_rows(pinned(books)), BOOK_FIELDS,
+                                   request.query_params.get('output', 'ndjson'), 'books')
+        except ExportError as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
 
-        updated_books = []
-        errors = []
+    @action(detail=False, methods=['get'])
+    @replica_reads
+    def rental_report_export(self, request):
+        """Stream every rental matching the report filters as NDJSON or CSV"""
+        try:
+            rentals = filter_rentals(BookRental.objects.all(), request.query_params)
+            updated_since = parse_updated_since(request.query_params.get('updated_since'))
+            if updated_since:
+                rentals = rentals.filter(updated_at__gte=updated_since)
+            return export_response(rental_rows(pinned(rentals)), RENTAL_FIELDS,
+                                   request.query_params.get('output', 'ndjson'), 'rentals')
+        except ExportError as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
 
-        for item in serializer.validated_data:
-            try:
-                book = Book.objects.get(id=item['book_id'])
-                book.amazon_id = item['amazon_id']
-                book.save()
-                updated_books.append({
-                    'book_id': book.id,
-                    'title': book.title,
-                    'amazon_id': book.amazon_id
-                })
-            except Book.DoesNotExist:
-                errors.append({
-                    'book_id': item['book_id'],
-                    'error': 'Book not found'
-                })
+    @action(detail=False, methods=['get'])
+    def rental_report_cache_stats(self, request):
+        """Get hit/miss counters of the rental report cache"""
+        return Response(cache_statistics(), status=status.HTTP_200_OK)
 
+    @action(detail=False, methods=['post'])
+    def update_amazon_ids(self, request):
+        """Update Amazon IDs for multiple books, sent as a JSON array or JSON Lines"""
+        if isinstance(request.data, Iterator):
+            # JSON Lines are parsed and validated a batch at a time as the
+            # update consumes them; an invalid line rolls the update back.
+            items = AmazonIdUpdateSerializer.validate_stream(request.data)
+        else:
+            serializer = AmazonIdUpdateSerializer(data=request.data, many=True)
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            items = serializer.validated_data
+
+        updated_books, errors = services.update_amazon_ids(items)
         return Response({
             'updated_books': updated_books,
             'errors': errors
@@ -225,14 +315,44 @@ class WishlistViewSet(viewsets.ModelViewSet):
     ViewSet for managing user wishlists
     """
     serializer_class = WishlistSerializer
+    # Ascending book id walks the unique (wishlist, book) index, so no sort is needed
+    cursor_ordering = ('book_id',)
+    ids_max_page_size = 1000
 
     def get_queryset(self):
-        user_email = self.request.data.get('email', None)
-        return Wishlist.objects.filter(wishlist_user_email=user_email)
+        params = self.request.query_params if self.request.method == 'GET' else self.request.data
+        return WishlistSerializer.setup_eager_loading(
+            Wishlist.objects.filter(wishlist_user_email=params.get('email')))
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    def list(self, request, *args, **kwargs):
+        """
+        List the books on the user's wishlist a cursor page at a time, or only
+        their ids with ``?ids_only=true``
+        """
+        email = request.query_params.get('email')
+        if not email:
+            return Response({'error': 'Email is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        paginator = KeysetPagination(ordering=self.cursor_ordering)
+        subscriptions = WishlistSubscription.objects.filter(wishlist__wishlist_user_email=email)
+        if request.query_params.get('ids_only', '').lower() == 'true':
+            paginator.max_page_size = self.ids_max_page_size
+            page = paginator.paginate_queryset(subscriptions.values('book_id'), request)
+            return paginator.get_paginated_response([row['book_id'] for row in page])
+
+        # Page over the subscriptions, then load that page's books with their
+        # language and authors in a fixed number of queries.
+        page = paginator.paginate_queryset(subscriptions.values('book_id'), request)
+        rows = {row['id']: row for row in BookSerializer.values(
+            Book.objects.filter(id__in=[row['book_id'] for row in page]))}
+        with serializing():
+            books = serialize_books(
+                [rows[row['book_id']] for row in page if row['book_id'] in rows])
+        return paginator.get_paginated_response(books)
+
     @action(detail=False, methods=['post'])
     def add_book(self, request):
         """Add a book to the user's wishlist"""
@@ -249,8 +369,11 @@ class WishlistViewSet(viewsets.ModelViewSet):
             # Create or get the user's wishlist
             wishlist, _ = Wishlist.objects.get_or_create(
                                     wishlist_user_email=request.data.get('email'),
-                                    wishlist_user_name=request.data.get('name'))
-            wishlist.books.add(book)
+                                    defaults={'wishlist_user_name': request.data.get('name')})
+            WishlistSubscription.objects.bulk_create(
+                [WishlistSubscription(wishlist=wishlist, book=book)], ignore_conflicts=True)
+            wishlist = WishlistSerializer.setup_eager_loading(
+                Wishlist.objects.filter(pk=wishlist.pk)).get()
             return Response(
                 WishlistSerializer(wishlist).data,
                 status=status.HTTP_200_OK
@@ -263,19 +386,35 @@ class WishlistViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['post'])
     def remove_book(self, request):
-        """Remove a book from the user's wishlist"""
-        book_id = request.data.get('book_id')
-        try:
-            book = Book.objects.get(id=book_id)
-            wishlist = Wishlist.objects.get(wishlist_user_email=request.data.get('email'))
-            wishlist.books.remove(book)
-            wishlist.save()
-            return Response(
-                WishlistSerializer(wishlist).data,
-                status=status.HTTP_200_OK
-            )
-        except Exception:
+        """Remove a book, or every book in ``book_ids``, from the user's wishlist"""
+        serializer = WishlistRemoveSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        email = serializer.validated_data['email']
+        # One DELETE through the unique (wishlist, book) index.
+        removed, _ = WishlistSubscription.objects.filter(
+            wishlist__wishlist_user_email=email,
+            book_id__in=serializer.validated_data['book_ids']).delete()
+        wishlist = WishlistSerializer.setup_eager_loading(
+            Wishlist.objects.filter(wishlist_user_email=email)).get() if removed else None
+        if wishlist is None:
             return Response(
                 {'error': "Book not found or not in wishlist"},
                 status=status.HTTP_404_NOT_FOUND
             )
+        return Response(
+            WishlistSerializer(wishlist).data,
+            status=status.HTTP_200_OK
+        )
+
+
+class PerformanceViewSet(viewsets.ViewSet):
+    """
+    ViewSet exposing the request measurements of this worker process to staff users
+    """
+    permission_classes = [IsAdminUser]
+
+    def list(self, request):
+        """Get p50/p95/p99 of the recent measurements of every endpoint"""
+        return Response(endpoint_statistics(), status=status.HTTP_200_OK)
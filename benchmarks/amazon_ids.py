@@ -0,0 +1,56 @@
+"""
+Benchmark ``POST /api/books/update-amazon-ids/`` and single-book saves.
+
+Reports the wall time and number of queries of one request updating the
+Amazon ID of every book (sent as a JSON array and as JSON Lines), and of
+re-saving every loaded book through the ORM (the path admin edits take).
+
+    python -m benchmarks.amazon_ids [--books 1000]
+"""
+import argparse
+import json
+
+from benchmarks.common import measure, test_database
+
+from rest_framework.test import APIClient
+
+from api.models import Book, Language
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--books', type=int, default=1000)
+    args = parser.parse_args()
+
+    with test_database():
+        language = Language.objects.create(name='eng')
+        Book.objects.bulk_create(
+            Book(id=i, isbn=str(1000000000 + i), title=f'Book {i}',
+                 publication_year=2000, language=language)
+            for i in range(1, args.books + 1))
+        payload = [{'book_id': i, 'amazon_id': f'B{i:09d}'} for i in range(1, args.books + 1)]
+
+        with measure() as request:
+            response = APIClient().post('/api/books/update-amazon-ids/', payload, format='json')
+        assert response.status_code == 200, response.content
+        assert len(response.data['updated_books']) == args.books
+        print(f"{args.books:>7,} books")
+        print(f"  update-amazon-ids request {request}")
+
+        body = '\n'.join(json.dumps(item) for item in payload)
+        with measure() as request:
+            response = APIClient().post('/api/books/update-amazon-ids/', body,
+                                        content_type='application/x-ndjson')
+        assert response.status_code == 200, response.content
+        print(f"  same as JSON Lines        {request}")
+
+        books = list(Book.objects.all()[:1000])
+        with measure() as saves:
+            for book in books:
+                book.amazon_id = f'C{book.id:09d}'
+                book.save()
+        print(f"  Book.save() on {len(books):,} books {saves}")
+
+
+if __name__ == '__main__':
+    main()
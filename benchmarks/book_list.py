@@ -0,0 +1,65 @@
+"""
+Benchmark ``GET /api/books/`` throughput at page sizes 10 and 100.
+
+Each configuration requests the same pages repeatedly and reports
+requests per second and queries per request, with the per-book
+representation cache disabled and warm.
+
+    python -m benchmarks.book_list [--books 5000] [--requests 200]
+"""
+import argparse
+
+from benchmarks.common import measure, test_database
+
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from api.models import Author, Book, Language
+
+
+def populate(count):
+    """Create ``count`` books with two authors each."""
+    language = Language.objects.create(name='eng')
+    authors = Author.objects.bulk_create(Author(name=f'Author {i}') for i in range(1, 501))
+    Book.objects.bulk_create(
+        Book(id=i, isbn=str(1000000000 + i), title=f'Book {i}',
+             publication_year=2000, language=language)
+        for i in range(1, count + 1))
+    through = Book.authors.through
+    through.objects.bulk_create(
+        through(book_id=i, author_id=authors[(i + offset) % len(authors)].pk)
+        for i in range(1, count + 1) for offset in (0, 1))
+
+
+def run(client, page_size, requests):
+    """Request ``requests`` pages of ``page_size`` books, cycling through the first ten pages."""
+    with measure() as result:
+        for i in range(requests):
+            response = client.get('/api/books/', {'page': i % 10 + 1, 'page_size': page_size})
+            assert response.status_code == 200
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--books', type=int, default=5000)
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+
+    with test_database():
+        populate(args.books)
+        client = APIClient()
+        for page_size in (10, 100):
+            for label, timeout in (('uncached', 0), ('cached', 3600)):
+                cache.clear()
+                with override_settings(BOOK_CACHE_TIMEOUT=timeout):
+                    run(client, page_size, 10)  # warm up
+                    result = run(client, page_size, args.requests)
+                print(f"page_size={page_size:<4} {label:<9} "
+                      f"{args.requests / result.seconds:8.1f} req/s  "
+                      f"{result.queries / args.requests:4.1f} queries/request")
+
+
+if __name__ == '__main__':
+    main()
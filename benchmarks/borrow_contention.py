@@ -0,0 +1,109 @@
+"""
+Contention benchmark: many borrowers competing for the copies of one title.
+
+``--borrowers`` threads, each with its own database connection, run
+``--cycles`` borrow/return cycles against a single book with ``--copies``
+copies, waiting while no copy is free. Reports completed cycles per second,
+cycle latency and how often the book row itself was written, then checks
+that every copy is back, every rental is closed and the book is available.
+
+    python -m benchmarks.borrow_contention [--borrowers 100] [--copies 10] [--cycles 5]
+"""
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import test_database
+
+from django.db import OperationalError, connection, connections
+
+from api import services
+from api.models import Book, BookInventory, BookRental, Language
+
+
+def retry(operation, book, email, wait_for_copy=False):
+    """Run ``operation`` until it succeeds, backing off on lock errors (and on
+    ``RentalError`` while waiting for a copy)."""
+    while True:
+        try:
+            return operation(book, email)
+        except services.RentalError:
+            if not wait_for_copy:
+                raise
+        except OperationalError:
+            pass
+        time.sleep(0.001)
+
+
+def borrower(book_id, email, cycles):
+    """Run the cycles of one borrower; returns ``(cycle seconds, book row writes)``."""
+    book_writes = 0
+
+    def count(execute, sql, params, many, context):
+        nonlocal book_writes
+        result = execute(sql, params, many, context)
+        # Availability flips are conditional UPDATEs; count the ones that matched.
+        if sql.startswith('UPDATE "api_book" ') and context['cursor'].rowcount > 0:
+            book_writes += 1
+        return result
+
+    durations = []
+    try:
+        with connection.execute_wrapper(count):
+            book = Book.objects.get(pk=book_id)
+            for _ in range(cycles):
+                started = time.perf_counter()
+                retry(services.borrow_book, book, email, wait_for_copy=True)
+                retry(services.return_book, book, email)
+                durations.append(time.perf_counter() - started)
+    finally:
+        connections.close_all()
+    return durations, book_writes
+
+
+def check(condition, message):
+    if not condition:
+        raise SystemExit(f"INVARIANT VIOLATED: {message}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--borrowers', type=int, default=100)
+    parser.add_argument('--copies', type=int, default=10)
+    parser.add_argument('--cycles', type=int, default=5)
+    args = parser.parse_args()
+
+    with test_database(file_based=True):
+        book = Book.objects.create(id=1, isbn='1000000001', title='Popular Book',
+                                   publication_year=2000,
+                                   language=Language.objects.create(name='eng'))
+        services.set_copies(book, args.copies)
+        emails = [f'user{i}@example.com' for i in range(args.borrowers)]
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.borrowers) as pool:
+            results = list(pool.map(lambda email: borrower(book.pk, email, args.cycles), emails))
+        elapsed = time.perf_counter() - started
+
+        cycles = args.borrowers * args.cycles
+        check(BookInventory.objects.filter(book=book, available_copies=args.copies).exists(),
+              "copies missing after every rental was returned")
+        check(BookRental.objects.filter(book=book).count() == cycles,
+              "rental count != completed cycles")
+        check(not BookRental.objects.filter(returned_date__isnull=True).exists(),
+              "rentals left open")
+        check(Book.objects.get(pk=book.pk).is_available, "book not available")
+
+        durations = sorted(d for thread, _ in results for d in thread)
+        book_writes = sum(writes for _, writes in results)
+        print(f"{connection.vendor}: {args.borrowers} borrowers, {args.copies} copies, "
+              f"{cycles} cycles in {elapsed:.2f}s ({cycles / elapsed:.0f} cycles/s)")
+        print(f"cycle latency p50 {statistics.median(durations) * 1000:.1f} ms  "
+              f"p99 {durations[int(0.99 * (len(durations) - 1))] * 1000:.1f} ms")
+        print(f"book row written {book_writes} times for {cycles * 2} borrows and returns; "
+              "invariants hold")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""
+Benchmark checking a stack of books out and back in, one request per book
+versus one bulk request.
+
+Reports the wall time and number of queries of borrowing and returning
+``--books`` books through ``/api/books/<pk>/borrow/`` and ``/return/``, and
+through ``/api/books/borrow/`` and ``/api/books/return/``.
+
+    python -m benchmarks.bulk_rentals [--books 50]
+"""
+import argparse
+
+from benchmarks.common import measure, test_database
+
+from rest_framework.test import APIClient
+
+from api.models import Book, BookInventory, Language
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--books', type=int, default=50)
+    args = parser.parse_args()
+
+    with test_database():
+        language = Language.objects.create(name='eng')
+        book_ids = list(range(1, args.books + 1))
+        Book.objects.bulk_create(
+            Book(id=i, isbn=str(1000000000 + i), title=f'Book {i}',
+                 publication_year=2000, language=language)
+            for i in book_ids)
+        BookInventory.objects.bulk_create(BookInventory(book_id=i) for i in book_ids)
+        client = APIClient()
+        email = {'email': 'kiosk@example.com'}
+        print(f"{args.books} books")
+
+        for action in ('borrow', 'return'):
+            with measure() as single:
+                for book_id in book_ids:
+                    response = client.post(f'/api/books/{book_id}/{action}/', email)
+                    assert response.status_code == 200, response.content
+            print(f"  {action:<6} one request per book {single}")
+
+        for action, done in (('borrow', 'borrowed'), ('return', 'returned')):
+            with measure() as bulk:
+                response = client.post(f'/api/books/{action}/',
+                                       {**email, 'book_ids': book_ids}, format='json')
+            assert response.status_code == 200, response.content
+            assert len(response.data[done]) == args.books, response.data['errors']
+            print(f"  {action:<6} one bulk request      {bulk}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Benchmarks run against a throwaway test database created from the project
+settings (``test_<NAME>``), so they never touch the development database.
+Run them from the project root, e.g. ``python -m benchmarks.rental_report``.
+"""
+import contextlib
+import os
+import tempfile
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'fca_assessment.settings')
+django.setup()
+
+from django.db import connection, connections  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+
+
+@contextlib.contextmanager
+def test_database(file_based=False):
+    """
+    Create a fresh, migrated test database for the duration of the block.
+    SQLite test databases live in memory unless ``file_based`` is set, which
+    concurrency benchmarks need so every thread sees real file locking.
+    """
+    setup_test_environment()
+    old_name = connection.settings_dict['NAME']
+    if file_based and connection.vendor == 'sqlite':
+        directory = tempfile.mkdtemp()
+        connection.settings_dict['TEST']['NAME'] = os.path.join(directory, 'benchmark.sqlite3')
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield connection
+    finally:
+        connections.close_all()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+class Measurement:
+    """Wall time and query count of a measured block."""
+    seconds = 0.0
+    queries = 0
+
+    def __str__(self):
+        return f"{self.seconds * 1000:9.1f} ms  {self.queries:5d} queries"
+
+
+@contextlib.contextmanager
+def measure():
+    """Measure the wall time and number of queries run inside the block."""
+    result = Measurement()
+
+    # Count through a wrapper: CaptureQueriesContext stops at 9000 queries.
+    def count(execute, sql, params, many, context):
+        result.queries += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count):
+        started = time.perf_counter()
+        yield result
+        result.seconds = time.perf_counter() - started
+
+
+def batched(iterable, size):
+    """Yield lists of up to ``size`` items from ``iterable``."""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,60 @@
+"""
+Benchmark the overhead of the request performance instrumentation.
+
+Requests a page of ``/api/books/`` ``--requests`` times with every request
+measured (``PERF_SAMPLE_RATE=1``), with a sample measured
+(``--sample-rate``) and with the instrumentation off, and reports the mean
+time per request of each. Then prints the Server-Timing header of one
+measured request.
+
+    python -m benchmarks.instrumentation [--books 200] [--requests 500] [--sample-rate 0.01]
+"""
+import argparse
+import time
+
+from benchmarks.common import test_database
+
+from django.conf import settings
+from django.test import Client
+
+from api.models import Author, Book, Language
+
+
+def mean_request_ms(client, requests):
+    started = time.perf_counter()
+    for _ in range(requests):
+        response = client.get('/api/books/', {'page_size': 20})
+        assert response.status_code == 200, response.content
+    return (time.perf_counter() - started) * 1000 / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--books', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--sample-rate', type=float, default=0.01)
+    args = parser.parse_args()
+
+    with test_database():
+        language = Language.objects.create(name='eng')
+        author = Author.objects.create(name='Author')
+        books = Book.objects.bulk_create(
+            Book(id=i, isbn=str(1000000000 + i), title=f'Book {i}',
+                 publication_year=2000, language=language)
+            for i in range(1, args.books + 1))
+        Book.authors.through.objects.bulk_create(
+            Book.authors.through(book_id=book.id, author_id=author.id) for book in books)
+        client = Client()
+        settings.PERF_SLOW_REQUEST_MS = 0
+        settings.PERF_SERVER_TIMING = True
+
+        mean_request_ms(client, 50)  # warm up the connection and the book cache
+        for label, rate in (('off', 0), (f'sampled {args.sample_rate:g}', args.sample_rate),
+                            ('every request', 1)):
+            settings.PERF_SAMPLE_RATE = rate
+            print(f"{label:<16} {mean_request_ms(client, args.requests):7.3f} ms/request")
+        print("Server-Timing:", client.get('/api/books/', {'page_size': 20})['Server-Timing'])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Load-test running deployments and compare throughput and tail latency.
+
+Opens ``--concurrency`` simultaneous HTTP/1.1 connections against each
+target and reports requests per second and p50/p99 latency. Each target is
+``name=url``. Start the servers yourself, with one worker each for a fair
+comparison, for example:
+
+    gunicorn fca_assessment.wsgi --workers 1 --threads 8 --bind 127.0.0.1:8000
+    uvicorn fca_assessment.asgi:application --workers 1 --port 8001
+
+    python -m benchmarks.load_test \\
+        --target wsgi=http://127.0.0.1:8000/api/books/?q=book \\
+        --target asgi=http://127.0.0.1:8001/api/async/books/?q=book \\
+        --concurrency 1 10 50 100 --requests 500
+
+``--read-delay`` makes every client pause before reading its response, to
+emulate slow clients on mobile connections.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from urllib.parse import urlsplit
+
+
+async def fetch(url, read_delay):
+    """Send one GET request and return its status code."""
+    parts = urlsplit(url)
+    target = parts.path + (f'?{parts.query}' if parts.query else '')
+    reader, writer = await asyncio.open_connection(parts.hostname, parts.port or 80)
+    try:
+        writer.write((f'GET {target} HTTP/1.1\r\nHost: {parts.netloc}\r\n'
+                      'Accept: application/json\r\nConnection: close\r\n\r\n').encode('ascii'))
+        await writer.drain()
+        if read_delay:
+            await asyncio.sleep(read_delay)
+        response = await reader.read()
+    finally:
+        writer.close()
+        await writer.wait_closed()
+    return int(response.split(b' ', 2)[1])
+
+
+async def run(url, concurrency, requests, read_delay):
+    """Issue ``requests`` requests over ``concurrency`` clients; return latencies and errors."""
+    latencies = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def client():
+        nonlocal errors
+        for _ in remaining:
+            started = time.perf_counter()
+            try:
+                ok = await fetch(url, read_delay) == 200
+            except OSError:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - started
+
+
+def percentile(values, fraction):
+    """Return the ``fraction`` percentile of ``values`` (nearest rank)."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--target', action='append', required=True,
+                        help='name=url of an endpoint to load (repeatable)')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 10, 50, 100])
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--read-delay', type=float, default=0.0,
+                        help='Seconds each client waits before reading its response.')
+    args = parser.parse_args()
+
+    targets = [target.split('=', 1) for target in args.target]
+    for concurrency in args.concurrency:
+        for name, url in targets:
+            latencies, errors, elapsed = asyncio.run(
+                run(url, concurrency, args.requests, args.read_delay))
+            if not latencies:
+                print(f"{name:<8} c={concurrency:<4} all {errors} requests failed")
+                continue
+            print(f"{name:<8} c={concurrency:<4} {len(latencies) / elapsed:8.1f} req/s  "
+                  f"p50 {statistics.median(latencies) * 1000:7.1f} ms  "
+                  f"p99 {percentile(latencies, 0.99) * 1000:7.1f} ms  errors {errors}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark the rental report statistics at 10k, 100k and 1M rentals.
+
+Compares the original per-query/per-row computation with the single
+aggregate query and the daily rollup, and times the full
+``/api/books/rental-report/`` request.
+
+    python -m benchmarks.rental_report [--sizes 10000 100000 1000000]
+"""
+import argparse
+import random
+from datetime import timedelta
+
+from benchmarks.common import batched, measure, test_database
+
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.models import Book, BookRental, Language
+from api.reports import rebuild_rollup, rental_statistics, report_periods, rollup_statistics
+
+
+def legacy_statistics(rentals):
+    """The statistics block as computed before the aggregate query."""
+    start_of_year, start_of_month, start_of_week = report_periods()
+    stats = {
+        'total_rentals': rentals.count(),
+        'currently_rented': rentals.filter(returned_date__isnull=True).count(),
+        'this_year_rentals': rentals.filter(borrowed_date__gte=start_of_year).count(),
+        'this_month_rentals': rentals.filter(borrowed_date__gte=start_of_month).count(),
+        'this_week_rentals': rentals.filter(borrowed_date__gte=start_of_week).count(),
+        'average_rental_days': 0,
+    }
+    completed_rentals = rentals.filter(returned_date__isnull=False)
+    if completed_rentals.exists():
+        total_days = 0
+        for rental in completed_rentals:
+            total_days += (rental.returned_date - rental.borrowed_date).days
+        stats['average_rental_days'] = total_days / completed_rentals.count()
+    return stats
+
+
+def populate(target, books):
+    """Top the rental table up to ``target`` rows spread over the last two years."""
+    now = timezone.now()
+    borrowed_field = BookRental._meta.get_field('borrowed_date')
+    borrowed_field.auto_now_add = False
+    try:
+        def rentals():
+            for i in range(BookRental.objects.count(), target):
+                borrowed = now - timedelta(minutes=random.randrange(2 * 365 * 24 * 60))
+                returned = (borrowed + timedelta(hours=random.randrange(1, 30 * 24))
+                            if i % 10 else None)
+                yield BookRental(book_id=books[i % len(books)], borrower_email=f'user{i % 5000}@example.com',
+                                 borrowed_date=borrowed, returned_date=returned)
+        for batch in batched(rentals(), 10000):
+            BookRental.objects.bulk_create(batch)
+    finally:
+        borrowed_field.auto_now_add = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--skip-legacy-above', type=int, default=1000000,
+                        help='Skip the legacy computation above this many rentals.')
+    args = parser.parse_args()
+
+    with test_database():
+        language = Language.objects.create(name='eng')
+        books = [Book(id=i, isbn=str(1000000000 + i), title=f'Book {i}',
+                      publication_year=2000, language=language) for i in range(1, 1001)]
+        Book.objects.bulk_create(books)
+        book_ids = [book.id for book in books]
+        client = APIClient()
+
+        for size in sorted(args.sizes):
+            populate(size, book_ids)
+            rebuild_rollup()
+            rentals = BookRental.objects.all()
+            print(f"{size:>9,} rentals")
+            if size <= args.skip_legacy_above:
+                with measure() as legacy:
+                    legacy_statistics(rentals)
+                print(f"  legacy statistics    {legacy}")
+            with measure() as aggregate:
+                rental_statistics(rentals)
+            print(f"  aggregate statistics {aggregate}")
+            with measure() as rollup:
+                rollup_statistics({})
+            print(f"  rollup statistics    {rollup}")
+            with measure() as request:
+                client.get('/api/books/rental-report/')
+            print(f"  full report request  {request}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Micro-benchmark the list serialisation paths.
+
+For a page of books and a page of rentals, compares loading, serialising
+and rendering with the DRF serializers and ``JSONRenderer`` against the
+``values()`` fast path with ``ORJSONRenderer``, in pages per second.
+
+    python -m benchmarks.serializers [--page-size 100] [--iterations 200]
+"""
+import argparse
+import time
+
+from benchmarks.common import test_database
+
+from rest_framework.renderers import JSONRenderer
+
+from api.models import Author, Book, BookRental, Language
+from api.renderers import ORJSONRenderer
+from api.serializers import BookRentalSerializer, BookSerializer
+
+
+def populate(count):
+    """Create ``count`` books with two authors and one rental each."""
+    language = Language.objects.create(name='eng')
+    authors = Author.objects.bulk_create(Author(name=f'Author {i}') for i in range(1, 201))
+    Book.objects.bulk_create(
+        Book(id=i, isbn=str(1000000000 + i), title=f'Book {i}',
+             publication_year=2000, language=language)
+        for i in range(1, count + 1))
+    through = Book.authors.through
+    through.objects.bulk_create(
+        through(book_id=i, author_id=authors[(i + offset) % len(authors)].pk)
+        for i in range(1, count + 1) for offset in (0, 1))
+    BookRental.objects.bulk_create(
+        BookRental(book_id=i, borrower_email=f'user{i}@example.com')
+        for i in range(1, count + 1))
+
+
+def rate(render, iterations):
+    """Return how many times per second ``render`` runs."""
+    started = time.perf_counter()
+    for _ in range(iterations):
+        render()
+    return iterations / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+
+    with test_database():
+        populate(args.page_size)
+        books = Book.objects.order_by('-created_at')[:args.page_size]
+        rentals = BookRental.objects.order_by('-borrowed_date')[:args.page_size]
+        paths = {
+            'books': (
+                lambda: JSONRenderer().render(BookSerializer(
+                    BookSerializer.setup_eager_loading(books), many=True).data),
+                lambda: ORJSONRenderer().render(BookSerializer.represent(
+                    BookSerializer.values(books))),
+            ),
+            'rentals': (
+                lambda: JSONRenderer().render(BookRentalSerializer(
+                    BookRentalSerializer.setup_eager_loading(rentals), many=True).data),
+                lambda: ORJSONRenderer().render(BookRentalSerializer.represent(
+                    BookRentalSerializer.values(rentals))),
+            ),
+        }
+        for name, (serializer, fast) in paths.items():
+            assert serializer() == fast(), f"{name} output differs"
+            before = rate(serializer, args.iterations)
+            after = rate(fast, args.iterations)
+            print(f"{name:<8} page of {args.page_size}: serializer {before:8.1f}/s  "
+                  f"fast path {after:8.1f}/s  ({after / before:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
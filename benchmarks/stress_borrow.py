@@ -0,0 +1,88 @@
+"""
+Stress test concurrent borrow/return against a file-backed database.
+
+Every round, each thread tries to borrow every book, then each winner's
+rental is returned twice concurrently. After each round the invariants are
+checked: one borrower per book, one active rental per borrowed book and
+every rental closed exactly once.
+
+    python -m benchmarks.stress_borrow [--threads 16] [--books 100] [--rounds 3]
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import test_database
+
+from django.db import OperationalError, connections
+
+from api import services
+from api.models import Book, BookInventory, BookRental, Language
+
+
+def attempt(operation, book, email):
+    """Run one operation, retrying on lock errors; True if it succeeded."""
+    try:
+        while True:
+            try:
+                operation(book, email)
+                return True
+            except services.RentalError:
+                return False
+            except OperationalError:
+                time.sleep(0.001)
+    finally:
+        connections.close_all()
+
+
+def check(condition, message):
+    if not condition:
+        raise SystemExit(f"INVARIANT VIOLATED: {message}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--books', type=int, default=100)
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    with test_database(file_based=True):
+        language = Language.objects.create(name='eng')
+        Book.objects.bulk_create([
+            Book(id=i, isbn=str(1000000000 + i), title=f'Book {i}',
+                 publication_year=2000, language=language)
+            for i in range(1, args.books + 1)])
+        BookInventory.objects.bulk_create(
+            [BookInventory(book_id=i) for i in range(1, args.books + 1)])
+        books = list(Book.objects.all())
+        emails = [f'user{i}@example.com' for i in range(args.threads)]
+
+        with ThreadPoolExecutor(max_workers=args.threads) as pool:
+            for round_number in range(1, args.rounds + 1):
+                started = time.perf_counter()
+                attempts = [(book, email) for book in books for email in emails]
+                borrowed = sum(pool.map(
+                    lambda args: attempt(services.borrow_book, *args), attempts))
+                check(borrowed == len(books), f"{borrowed} borrows succeeded for {len(books)} books")
+                active = BookRental.objects.filter(returned_date__isnull=True)
+                check(active.count() == len(books), "active rentals != books")
+                check(not Book.objects.filter(is_available=True).exists(), "a borrowed book is available")
+
+                winners = {book.pk: book for book in books}
+                returns = [(winners[book_id], email)
+                           for book_id, email in active.values_list('book_id', 'borrower_email')
+                           for _ in range(2)]
+                returned = sum(pool.map(
+                    lambda args: attempt(services.return_book, *args), returns))
+                check(returned == len(books), f"{returned} returns succeeded for {len(books)} rentals")
+                check(not active.exists(), "rentals left open")
+
+                elapsed = time.perf_counter() - started
+                operations = len(attempts) + len(returns)
+                print(f"round {round_number}: {operations} operations in {elapsed:.2f}s "
+                      f"({operations / elapsed:.0f} ops/s), invariants hold")
+
+
+if __name__ == '__main__':
+    main()